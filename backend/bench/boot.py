@@ -0,0 +1,106 @@
+"""
+Worker boot time and memory.
+
+Imports main in fresh interpreters under -X importtime, the same work a
+uvicorn worker does before it can serve, and reports the median total import
+time, peak RSS and the slowest imports. Fails if a budget is exceeded or if a
+module that should load lazily (e.g. extruct) was imported at boot.
+
+    python -m bench.boot --runs 5 --max-import-ms 1500 --max-rss-mb 150
+"""
+import argparse
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from dataclasses import dataclass
+
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+LAZY_MODULES = ["extruct", "w3lib", "pyppeteer", "rdflib", "mf2py"]
+
+PROBE = """
+import resource, sys
+import main
+print("rss_kb", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr)
+print("modules", " ".join(sorted(sys.modules)), file=sys.stderr)
+"""
+
+
+@dataclass
+class Boot:
+    import_us: int
+    rss_kb: int
+    modules: set[str]
+    cumulative_us: dict[str, int]
+
+
+def boot_once(env: dict[str, str]) -> Boot:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_us = 0
+    rss_kb = 0
+    modules: set[str] = set()
+    cumulative_us: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            _, cumulative, name = line.removeprefix("import time:").split("|")
+            cumulative_us[name.strip()] = int(cumulative)
+            # top level imports are not indented, nested ones are
+            if name.startswith(" ") and not name.startswith("  "):
+                import_us += int(cumulative)
+        elif line.startswith("rss_kb "):
+            rss_kb = int(line.split()[1])
+        elif line.startswith("modules "):
+            modules = set(line.split()[1:])
+    return Boot(import_us, rss_kb, modules, cumulative_us)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports shown")
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-rss-mb", type=float, default=None)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="itemize-boot-")
+    env = os.environ | {"DB_URI": f"sqlite+aiosqlite:///{scratch}/boot.sqlite3"}
+    boots = [boot_once(env) for _ in range(args.runs)]
+
+    import_ms = statistics.median(boot.import_us for boot in boots) / 1000
+    rss_mb = statistics.median(boot.rss_kb for boot in boots) / 1024
+    print(
+        f"import main: {import_ms:.0f}ms  peak rss: {rss_mb:.1f}MiB  ({args.runs} runs)"
+    )
+
+    last = boots[-1]
+    print("slowest imports (cumulative, last run):")
+    for name, us in sorted(last.cumulative_us.items(), key=lambda x: -x[1])[: args.top]:
+        print(f"  {us / 1000:8.1f}ms  {name}")
+
+    failures = []
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        failures.append(f"import time {import_ms:.0f}ms > {args.max_import_ms}ms")
+    if args.max_rss_mb is not None and rss_mb > args.max_rss_mb:
+        failures.append(f"peak rss {rss_mb:.1f}MiB > {args.max_rss_mb}MiB")
+    eager = [module for module in LAZY_MODULES if module in last.modules]
+    if eager:
+        failures.append(f"imported at boot, should be lazy: {', '.join(eager)}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Local stand-in for a retailer site.
+
+Serves the product pages in bench/pages at /product/<name> and a small image at
+/images/<name>, so the metadata pipeline can be exercised without network
+access. The pages are modelled on real retailer markup: Open Graph only,
+JSON-LD with navigation and reviews around it, microdata, and none at all.
+Any query string is ignored, which makes it easy to mint unique URLs for the
+same page. Every response is delayed by latency plus up to jitter seconds.
+
+    python -m bench.fake_retailer --port 8765 --latency 0.1 --jitter 0.05
+"""
+import argparse
+import pathlib
+import random
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from typing import Any
+
+
+PAGES_DIR = pathlib.Path(__file__).parent / "pages"
+# 1x1 transparent png
+IMAGE = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082"
+)
+
+
+class FakeRetailer:
+    def __init__(
+        self,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.pages = {
+            path.stem: path.read_text() for path in sorted(PAGES_DIR.glob("*.html"))
+        }
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def product_url(self, name: str, *, variant: int | None = None) -> str:
+        url = f"{self.base_url}/product/{name}"
+        if variant is not None:
+            url += f"?variant={variant}"
+        return url
+
+    def start(self) -> "FakeRetailer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeRetailer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        retailer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                delay = retailer.latency + random.uniform(0, retailer.jitter)
+                if delay > 0:
+                    time.sleep(delay)
+
+                parts = urlsplit(self.path).path.strip("/").split("/")
+                match parts:
+                    case ["product", name] if name in retailer.pages:
+                        body = retailer.pages[name].replace(
+                            "{base_url}", retailer.base_url
+                        )
+                        self._send(200, "text/html; charset=utf-8", body.encode())
+                    case ["images", _]:
+                        self._send(200, "image/png", IMAGE)
+                    case _:
+                        self._send(404, "text/plain", b"not found")
+
+            def _send(self, status: int, content_type: str, body: bytes) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds")
+    args = parser.parse_args()
+
+    retailer = FakeRetailer(
+        host=args.host, port=args.port, latency=args.latency, jitter=args.jitter
+    )
+    print(f"Serving {', '.join(retailer.pages)} at {retailer.base_url}/product/")
+    retailer.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        retailer.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Shared setup for scripts that drive the app in-process.
+
+Importing this module points the app at a scratch SQLite database and turns
+off page dumps, background jobs and the response cache before any itemize
+module reads its configuration, so it must be imported before main or itemize.
+"""
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix="itemize-bench-")
+
+os.environ.setdefault("DB_URI", f"sqlite+aiosqlite:///{SCRATCH_DIR}/bench.sqlite3")
+os.environ.setdefault("PARSER_LOG_PAGEDATA", "false")
+os.environ.setdefault("ECHO_SQL", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("RESPONSE_CACHE_BACKEND", "none")
+os.environ.setdefault("SYSTEM_TOKEN", "bench")
+# background jobs would run their first pass among the measured requests
+os.environ.setdefault("GC_INTERVAL_SECONDS", "0")
+os.environ.setdefault("WATCH_INTERVAL_SECONDS", "0")
+
+import uvicorn  # noqa: E402
+
+from contextlib import contextmanager  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from typing import Iterator  # noqa: E402
+
+import main  # noqa: E402
+
+
+def client() -> TestClient:
+    return TestClient(main.app)
+
+
+@contextmanager
+def serve() -> Iterator[str]:
+    """
+    Run the app under uvicorn in a background thread and yield its base URL,
+    for benchmarks that need real concurrent requests.
+    """
+    server = uvicorn.Server(
+        uvicorn.Config(main.app, host="127.0.0.1", port=0, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    if len(samples) < 2:
+        return {
+            "p50": samples[0] if samples else 0.0,
+            "p99": samples[-1] if samples else 0.0,
+        }
+    quantiles = statistics.quantiles(samples, n=100)
+    return {"p50": quantiles[49], "p99": quantiles[98]}
+
+
+def signup(client: TestClient, username: str) -> dict[str, str]:
+    response = client.post(
+        "/users",
+        json={
+            "username": username,
+            "email": f"{username}@example.com",
+            "password": "password",
+            "first_name": "Bench",
+            "last_name": "Mark",
+        },
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['token']}"}
@@ -0,0 +1,176 @@
+"""
+Load driver for the read and metadata endpoints.
+
+Starts the app under uvicorn and the fake retailer, seeds a public itemize,
+then drives each scenario with a fixed number of concurrent clients for a
+fixed duration and reports throughput and p50/p99 latency. With --max-p99-ms
+it exits non-zero if any scenario is slower, so it can gate a deploy.
+
+    python -m bench.load --duration 10 --concurrency 16 --latency 0.05
+"""
+from bench import harness
+
+from bench.fake_retailer import FakeRetailer
+
+import argparse
+import asyncio
+import itertools
+import sys
+import time
+
+import httpx
+
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+
+USERNAME = "loader"
+SLUG = "catalog"
+
+
+@dataclass
+class Result:
+    scenario: str
+    latencies: list[float]
+    errors: int
+    elapsed: float
+
+    @property
+    def throughput(self) -> float:
+        return len(self.latencies) / self.elapsed if self.elapsed else 0.0
+
+
+async def drive(
+    scenario: str,
+    request: Callable[[int], Awaitable[httpx.Response]],
+    *,
+    duration: float,
+    concurrency: int,
+) -> Result:
+    latencies: list[float] = []
+    errors = 0
+    counter = itertools.count()
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await request(next(counter))
+                response.raise_for_status()
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return Result(scenario, sorted(latencies), errors, time.perf_counter() - start)
+
+
+async def run(
+    base_url: str, retailer: FakeRetailer, args: argparse.Namespace
+) -> list[Result]:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        response = await client.post(
+            "/users",
+            json={
+                "username": USERNAME,
+                "email": f"{USERNAME}@example.com",
+                "password": "password",
+                "first_name": "Load",
+                "last_name": "Driver",
+            },
+        )
+        response.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {response.json()['token']}"
+
+        base = f"/itemize/{USERNAME}"
+        (
+            await client.post(base, json={"name": "Catalog", "description": None})
+        ).raise_for_status()
+        (
+            await client.patch(
+                f"{base}/{SLUG}",
+                json={"name": None, "description": None, "public": True},
+            )
+        ).raise_for_status()
+
+        pages = sorted(retailer.pages)
+        seeded = [
+            retailer.product_url(pages[i % len(pages)], variant=i)
+            for i in range(args.links)
+        ]
+        for url in seeded:
+            (await client.post(f"{base}/{SLUG}", json={"url": url})).raise_for_status()
+
+        # each fresh request mints URLs nobody has fetched yet
+        fresh = itertools.count(args.links)
+
+        scenarios: dict[str, Callable[[int], Awaitable[httpx.Response]]] = {
+            "get itemize": lambda i: client.get(f"{base}/{SLUG}"),
+            "list itemizes": lambda i: client.get(base),
+            "metadata (stored)": lambda i: client.post(
+                "/metadata", json={"urls": seeded[i % len(seeded) :][:3]}
+            ),
+            "metadata (fresh)": lambda i: client.post(
+                "/metadata",
+                json={
+                    "urls": [
+                        retailer.product_url(pages[n % len(pages)], variant=n)
+                        for n in itertools.islice(fresh, 3)
+                    ]
+                },
+            ),
+        }
+        return [
+            await drive(
+                name,
+                request,
+                duration=args.duration,
+                concurrency=args.concurrency,
+            )
+            for name, request in scenarios.items()
+            if not args.scenario or name.split()[0] in args.scenario
+        ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--links", type=int, default=50, help="links to seed")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="seconds")
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=["get", "list", "metadata"],
+        help="run only these scenarios (repeatable)",
+    )
+    parser.add_argument("--max-p99-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    with FakeRetailer(
+        latency=args.latency, jitter=args.jitter
+    ) as retailer, harness.serve() as base_url:
+        results = asyncio.run(run(base_url, retailer, args))
+
+    failed = False
+    for result in results:
+        stats = harness.percentiles(result.latencies)
+        slow = args.max_p99_ms is not None and stats["p99"] * 1000 > args.max_p99_ms
+        failed = failed or slow or result.errors > 0
+        print(
+            f"{result.scenario:<20} n={len(result.latencies):<6} "
+            f"{result.throughput:>8.1f} req/s "
+            f"p50={stats['p50'] * 1000:>8.1f}ms p99={stats['p99'] * 1000:>8.1f}ms "
+            f"errors={result.errors}{'  SLOW' if slow else ''}"
+        )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
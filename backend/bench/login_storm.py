@@ -0,0 +1,88 @@
+"""
+Latency of other endpoints during a burst of logins.
+
+Starts the app under uvicorn, fires concurrent logins while a probe keeps
+requesting a cheap endpoint, and reports the probe's p50/p99 latency. If
+password hashing blocks the event loop the probe's p99 climbs to the cost of
+several hashes.
+
+    python -m bench.login_storm --logins 50 --concurrency 10
+"""
+from bench import harness
+
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+
+async def storm(base_url: str, *, logins: int, concurrency: int) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        system = {"Authorization": f"Bearer {os.environ['SYSTEM_TOKEN']}"}
+        response = await client.post(
+            "/users",
+            json={
+                "username": "storm",
+                "email": "storm@example.com",
+                "password": "password",
+                "first_name": "Login",
+                "last_name": "Storm",
+            },
+        )
+        response.raise_for_status()
+
+        async def probe(samples: list[float], done: asyncio.Event) -> None:
+            while not done.is_set():
+                start = time.perf_counter()
+                (await client.get("/system/db", headers=system)).raise_for_status()
+                samples.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def login() -> None:
+            async with semaphore:
+                response = await client.post(
+                    "/users/login", data={"username": "storm", "password": "password"}
+                )
+                response.raise_for_status()
+
+        idle: list[float] = []
+        idle_done = asyncio.Event()
+        idle_task = asyncio.create_task(probe(idle, idle_done))
+        await asyncio.sleep(1)
+        idle_done.set()
+        await idle_task
+
+        during: list[float] = []
+        done = asyncio.Event()
+        probe_task = asyncio.create_task(probe(during, done))
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+
+    for name, samples in (("idle", idle), ("during storm", during)):
+        stats = harness.percentiles(sorted(samples))
+        print(
+            f"probe {name:<13} n={len(samples):<5} "
+            f"p50={stats['p50'] * 1000:7.1f}ms p99={stats['p99'] * 1000:7.1f}ms"
+        )
+    print(f"logins: {logins} in {elapsed:.2f}s ({logins / elapsed:.1f}/s)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    with harness.serve() as base_url:
+        asyncio.run(storm(base_url, logins=args.logins, concurrency=args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
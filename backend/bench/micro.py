@@ -0,0 +1,170 @@
+"""
+Micro benchmarks for page parsing and response serialization.
+
+Times MetadataParser construction (extruct) and parse() over every page in
+bench/pages, and the kettle page once more through a domain extractor that
+finds every field so extruct is skipped. Then times to_schema() and JSON
+rendering of an itemize with a growing number of links built in memory, and
+prints p50/p99 per operation.
+
+    python -m bench.micro --iterations 200
+"""
+from bench import harness
+
+from bench.fake_retailer import PAGES_DIR
+
+from itemize import models
+from itemize import schemas
+from itemize.extractors import DomainExtractor
+from itemize.metadata import MetadataParser
+
+import argparse
+import asyncio
+import time
+
+from datetime import datetime
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+from typing import Any, Awaitable, Callable
+
+
+BASE_URL = "http://retailer.test"
+
+KETTLE_EXTRACTOR = DomainExtractor(
+    name="kettle",
+    hosts=("retailer.test",),
+    css={
+        "title": ["[itemprop=name]::text"],
+        "description": ["[itemprop=description]::text"],
+        "image_url": ["[itemprop=image]::attr(src)"],
+        "price": ["[itemprop=price]::attr(content)"],
+        "currency": ["[itemprop=priceCurrency]::attr(content)"],
+        "site_name": ["meta[property='og:site_name']::attr(content)"],
+    },
+)
+
+
+def report(name: str, samples: list[float]) -> None:
+    stats = harness.percentiles(sorted(samples))
+    print(
+        f"{name:<32} n={len(samples):<6} "
+        f"p50={stats['p50'] * 1e6:>9.1f}us p99={stats['p99'] * 1e6:>9.1f}us"
+    )
+
+
+def bench_page(name: str, html: str, url: str, iterations: int, **kwargs: Any) -> None:
+    extract: list[float] = []
+    parse: list[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        parser = MetadataParser(html, url, **kwargs)
+        extract.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        parser.parse()
+        parse.append(time.perf_counter() - start)
+    report(f"extract {name} ({len(html) // 1024}KiB)", extract)
+    report(f"parse {name}", parse)
+
+
+def bench_parser(iterations: int) -> None:
+    for path in sorted(PAGES_DIR.glob("*.html")):
+        html = path.read_text().replace("{base_url}", BASE_URL)
+        bench_page(path.stem, html, f"{BASE_URL}/product/{path.stem}", iterations)
+
+    html = (PAGES_DIR / "kettle.html").read_text().replace("{base_url}", BASE_URL)
+    bench_page(
+        "kettle (extractor)",
+        html,
+        f"{BASE_URL}/product/kettle",
+        iterations,
+        extractor=KETTLE_EXTRACTOR,
+    )
+
+
+def build_itemize(links: int) -> models.Itemize:
+    now = datetime.utcnow()
+    image = models.MetadataImage(id=1, created_at=now, updated_at=now, mime="png")
+    itemize = models.Itemize(
+        id=1,
+        created_at=now,
+        updated_at=now,
+        name="Bench",
+        slug="bench",
+        description=None,
+        user_id=1,
+        public=True,
+    )
+    # set the collection as if it was loaded, without populating link.itemize
+    # through the backref (loaded rows leave it unloaded, and to_schema would
+    # recurse between the two)
+    set_committed_value(  # type: ignore[no-untyped-call]
+        itemize,
+        "links",
+        [
+            models.Link(
+                id=i,
+                created_at=now,
+                updated_at=now,
+                url=f"{BASE_URL}/product/{i}",
+                itemize_id=1,
+                page_metadata_id=i,
+                page_metadata=models.PageMetadata(
+                    id=i,
+                    created_at=now,
+                    updated_at=now,
+                    url=f"{BASE_URL}/product/{i}",
+                    title=f"Product {i}",
+                    description="A product used for benchmarking serialization.",
+                    site_name="Retailer",
+                    image_url=f"{BASE_URL}/images/{i}.png",
+                    price="19.99",
+                    currency="USD",
+                    image_id=1,
+                    image=image,
+                ),
+            )
+            for i in range(links)
+        ],
+    )
+    return itemize
+
+
+async def time_async(
+    func: Callable[[], Awaitable[object]], iterations: int
+) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def bench_serialization(iterations: int) -> None:
+    for links in (1, 10, 100, 500):
+        itemize = build_itemize(links)
+        schema = await itemize.to_schema()
+        report(
+            f"to_schema {links} links",
+            await time_async(itemize.to_schema, iterations),
+        )
+
+        async def render() -> bytes:
+            return schemas.GetItemizeResponse(itemize=schema).model_dump_json().encode()
+
+        report(f"render {links} links", await time_async(render, iterations))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    bench_parser(args.iterations)
+    asyncio.run(bench_serialization(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+SQL statement budget per endpoint.
+
+Drives the main endpoints against a scratch database and the fake retailer,
+counts the statements each request issues and exits non-zero if any count
+is over its budget. Lower a budget when a change removes statements.
+
+    python -m bench.query_counts
+"""
+from bench import harness
+from bench.fake_retailer import FakeRetailer
+
+from itemize.db import DB
+
+import sys
+
+from typing import Any, Callable
+
+import httpx
+
+
+BUDGETS = {
+    "create user": 3,
+    "login": 1,
+    "create itemize": 5,
+    "create link": 6,
+    "create link (cached metadata)": 4,
+    "update link metadata (new override)": 3,
+    "update link metadata (existing override)": 1,
+    "update itemize": 3,
+    "get itemize": 5,  # itemize, links, images of both sources, totals
+    "list itemizes": 5,
+    "get metadata (3 urls)": 12,
+    "delete link": 3,  # link and its override
+}
+
+
+def measure(
+    results: dict[str, int], name: str, request: Callable[[], httpx.Response]
+) -> Any:
+    with DB.count_statements() as counter:
+        response = request()
+    response.raise_for_status()
+    results[name] = counter.count
+    return response.json() if response.content else None
+
+
+def run(retailer: FakeRetailer) -> dict[str, int]:
+    results: dict[str, int] = {}
+    url = retailer.product_url("widget")
+
+    with harness.client() as client:
+        measure(
+            results,
+            "create user",
+            lambda: client.post(
+                "/users",
+                json={
+                    "username": "counter",
+                    "email": "counter@example.com",
+                    "password": "password",
+                    "first_name": "Query",
+                    "last_name": "Counter",
+                },
+            ),
+        )
+        token = measure(
+            results,
+            "login",
+            lambda: client.post(
+                "/users/login", data={"username": "counter", "password": "password"}
+            ),
+        )["access_token"]
+        auth = {"Authorization": f"Bearer {token}"}
+        base = "/itemize/counter"
+
+        measure(
+            results,
+            "create itemize",
+            lambda: client.post(
+                base, json={"name": "Counted", "description": None}, headers=auth
+            ),
+        )
+        link = measure(
+            results,
+            "create link",
+            lambda: client.post(f"{base}/counted", json={"url": url}, headers=auth),
+        )["link"]
+        client.post(
+            "/metadata",
+            json={"urls": [retailer.product_url("widget", variant=0)]},
+            headers=auth,
+        ).raise_for_status()
+        measure(
+            results,
+            "create link (cached metadata)",
+            lambda: client.post(
+                f"{base}/counted",
+                json={"url": retailer.product_url("widget", variant=0)},
+                headers=auth,
+            ),
+        )
+
+        override: dict[str, str | None] = {
+            "title": "Mine",
+            "description": None,
+            "image_url": None,
+            "site_name": None,
+            "price": None,
+            "currency": None,
+        }
+        for name in ("new override", "existing override"):
+            measure(
+                results,
+                f"update link metadata ({name})",
+                lambda: client.patch(
+                    f"{base}/counted/{link['id']}", json=override, headers=auth
+                ),
+            )
+        measure(
+            results,
+            "update itemize",
+            lambda: client.patch(
+                f"{base}/counted",
+                json={"name": None, "description": None, "public": True},
+                headers=auth,
+            ),
+        )
+        measure(results, "get itemize", lambda: client.get(f"{base}/counted"))
+        measure(results, "list itemizes", lambda: client.get(base, headers=auth))
+        measure(
+            results,
+            "get metadata (3 urls)",
+            lambda: client.post(
+                "/metadata",
+                json={
+                    "urls": [
+                        retailer.product_url("widget", variant=i) for i in range(1, 4)
+                    ]
+                },
+                headers=auth,
+            ),
+        )
+        measure(
+            results,
+            "delete link",
+            lambda: client.delete(f"{base}/counted/{link['id']}", headers=auth),
+        )
+
+    return results
+
+
+def main() -> None:
+    with FakeRetailer() as retailer:
+        results = run(retailer)
+
+    failed = False
+    for name, count in results.items():
+        budget = BUDGETS[name]
+        status = "ok" if count <= budget else "OVER BUDGET"
+        failed |= count > budget
+        print(f"{name:<45} {count:>3} / {budget:<3} {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Statement construction overhead of the hot lookups.
+
+Compares building each lookup ad hoc with select() against the cached lambda
+statements in itemize.queries, both for construction plus cache key
+generation alone and for full execution against the scratch database.
+
+    python -m bench.statements --iterations 2000
+"""
+from bench import harness  # noqa: F401
+
+from itemize import models
+from itemize import queries
+from itemize.db import DB
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import Select, select
+from sqlalchemy.orm import contains_eager, joinedload
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+
+from typing import Any, Callable
+
+
+Statement = Select[Any] | StatementLambdaElement
+
+
+def adhoc_itemize_by_owner(username: str, slug: str) -> Statement:
+    return (
+        select(models.Itemize)
+        .join(models.User)
+        .where(models.User.username == username, models.Itemize.slug == slug)
+    )
+
+
+def adhoc_itemize_with_user_by_owner(username: str, slug: str) -> Statement:
+    return (
+        select(models.Itemize)
+        .join(models.Itemize.user)
+        .where(models.User.username == username, models.Itemize.slug == slug)
+        .options(contains_eager(models.Itemize.user))
+    )
+
+
+def adhoc_link_with_metadata_by_owner(
+    username: str, slug: str, link_id: int
+) -> Statement:
+    return (
+        select(models.Link)
+        .join(models.Itemize)
+        .join(models.User)
+        .where(
+            models.User.username == username,
+            models.Itemize.slug == slug,
+            models.Link.id == link_id,
+        )
+        .options(
+            joinedload(models.Link.page_metadata).joinedload(models.PageMetadata.image),
+            joinedload(models.Link.page_metadata_override).joinedload(
+                models.PageMetadataOverride.image
+            ),
+        )
+    )
+
+
+CASES: dict[str, tuple[Callable[[int], Statement], Callable[[int], Statement]]] = {
+    "itemize_by_owner": (
+        lambda i: adhoc_itemize_by_owner(f"user{i}", "slug"),
+        lambda i: queries.itemize_by_owner(f"user{i}", "slug"),
+    ),
+    "itemize_with_user_by_owner": (
+        lambda i: adhoc_itemize_with_user_by_owner(f"user{i}", "slug"),
+        lambda i: queries.itemize_with_user_by_owner(f"user{i}", "slug"),
+    ),
+    "link_with_metadata_by_owner": (
+        lambda i: adhoc_link_with_metadata_by_owner(f"user{i}", "slug", i),
+        lambda i: queries.link_with_metadata_by_owner(f"user{i}", "slug", i),
+    ),
+}
+
+
+def time_construction(build: Callable[[int], Statement], iterations: int) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        build(i)._generate_cache_key()
+    return (time.perf_counter() - start) / iterations
+
+
+async def time_execution(build: Callable[[int], Statement], iterations: int) -> float:
+    async with DB.session() as session:
+        await session.scalar(build(0))
+        start = time.perf_counter()
+        for i in range(iterations):
+            await session.scalar(build(i))
+        return (time.perf_counter() - start) / iterations
+
+
+async def run(iterations: int) -> None:
+    await DB.init_db()
+    print(f"{'statement':<30} {'stage':<10} {'ad hoc':>10} {'lambda':>10} {'saved':>7}")
+    for name, (adhoc, cached) in CASES.items():
+        for stage, adhoc_time, cached_time in (
+            (
+                "build",
+                time_construction(adhoc, iterations),
+                time_construction(cached, iterations),
+            ),
+            (
+                "execute",
+                await time_execution(adhoc, iterations),
+                await time_execution(cached, iterations),
+            ),
+        ):
+            print(
+                f"{name:<30} {stage:<10} {adhoc_time * 1e6:>8.1f}us "
+                f"{cached_time * 1e6:>8.1f}us "
+                f"{(1 - cached_time / adhoc_time) * 100:>6.1f}%"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Span tree of a single create_link against the fake retailer.
+
+Runs with the in-memory trace exporter and prints every span of the request
+with its duration, so it is easy to see whether the time went to the page
+fetch, extruct, the image download or the commits.
+
+    python -m bench.trace_link --latency 0.05
+"""
+import os
+
+os.environ.setdefault("TRACING_EXPORTER", "memory")
+
+from bench import harness  # noqa: E402
+from bench.fake_retailer import FakeRetailer  # noqa: E402
+
+from itemize import tracing  # noqa: E402
+
+import argparse  # noqa: E402
+
+from typing import Any  # noqa: E402
+
+
+def print_tree(spans: list[Any]) -> None:
+    children: dict[int | None, list[Any]] = {}
+    for span in spans:
+        parent = span.parent.span_id if span.parent is not None else None
+        children.setdefault(parent, []).append(span)
+
+    def walk(parent: int | None, depth: int) -> None:
+        for span in sorted(children.get(parent, []), key=lambda s: s.start_time):
+            duration_ms = (span.end_time - span.start_time) / 1e6
+            print(f"{duration_ms:10.2f}ms  {'  ' * depth}{span.name}")
+            walk(span.context.span_id, depth + 1)
+
+    walk(None, 0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    args = parser.parse_args()
+
+    if not tracing.enabled():
+        raise SystemExit("opentelemetry is not installed, see requirements.tracing")
+
+    with FakeRetailer(latency=args.latency) as retailer, harness.client() as client:
+        headers = harness.signup(client, "tracer")
+        client.post(
+            "/itemize/tracer",
+            json={"name": "Traced", "description": None},
+            headers=headers,
+        ).raise_for_status()
+
+        start = len(tracing.finished_spans())
+        client.post(
+            "/itemize/tracer/traced",
+            json={"url": retailer.product_url("widget")},
+            headers=headers,
+        ).raise_for_status()
+        print_tree(tracing.finished_spans()[start:])
+
+
+if __name__ == "__main__":
+    main()
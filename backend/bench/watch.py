@@ -0,0 +1,173 @@
+"""
+Price watcher throughput.
+
+Seeds a scratch database with --pages watched pages spread over --domains
+fake retailers, one per loopback address (127.0.0.2, 127.0.0.3, ...) so each
+is its own domain, and stores every other page at a higher price than the
+page shows. Then runs one watch pass while a local consumer reads the price
+drop events from the queue, and reports pages per second, SQL statements per
+page and whether every drop arrived. Exits non-zero if a page was not
+checked or a drop is missing.
+
+    python -m bench.watch --pages 2000 --domains 8 --latency 0.02
+"""
+import os
+
+os.environ.setdefault("WATCH_INTERVAL_SECONDS", "0")
+os.environ.setdefault("WATCH_EVENTS_BACKEND", "memory")
+os.environ.setdefault("WATCH_EVENTS_MAX_LENGTH", "1000000")
+
+from bench import harness  # noqa: E402,F401
+from bench.fake_retailer import FakeRetailer  # noqa: E402
+
+from itemize import models  # noqa: E402
+from itemize import prices  # noqa: E402
+from itemize import schemas  # noqa: E402
+from itemize import watch  # noqa: E402
+
+from itemize.db import DB  # noqa: E402
+from itemize.resources import Resources, open_resources  # noqa: E402
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import contextlib  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+
+from datetime import datetime, timedelta  # noqa: E402
+
+from sqlalchemy import insert, select  # noqa: E402
+
+
+# priced pages in bench/pages and what they show
+PAGES = {
+    "kettle": ("89.95", "EUR"),
+    "sneaker": ("129.00", "GBP"),
+    "widget": ("1,299.99", "USD"),
+}
+
+
+async def seed(retailers: list[FakeRetailer], pages: int) -> int:
+    """
+    Store the watched pages and link them, returning how many should drop.
+    """
+    stale = datetime.utcnow() - timedelta(days=1)
+    rows = []
+    drops = 0
+    for i in range(pages):
+        name, (price, currency) = list(PAGES.items())[i % len(PAGES)]
+        price_minor, currency_code = prices.normalize(price, currency)
+        assert price_minor is not None
+        if i % 2 == 0:
+            price_minor += 100
+            drops += 1
+        retailer = retailers[i % len(retailers)]
+        rows.append(
+            {
+                "url": retailer.product_url(name, variant=i),
+                "title": name,
+                "price": price,
+                "currency": currency,
+                "price_minor": price_minor,
+                "currency_code": currency_code,
+                "created_at": stale,
+                "updated_at": stale,
+            }
+        )
+
+    async with DB.session() as session:
+        user = models.User(
+            username="watcher",
+            email="watcher@example.com",
+            first_name="Watch",
+            last_name="Er",
+            hashed_password=b"",
+        )
+        itemize = models.Itemize(name="Watched", slug="watched", user=user)
+        session.add(itemize)
+        await session.flush()
+        await session.execute(insert(models.PageMetadata), rows)
+        page_ids = await session.scalars(select(models.PageMetadata.id))
+        await session.execute(
+            insert(models.Link),
+            [
+                {"url": f"link-{id}", "itemize_id": itemize.id, "page_metadata_id": id}
+                for id in page_ids
+            ],
+        )
+        await session.commit()
+    return drops
+
+
+async def consume(resources: Resources, received: list[schemas.PriceDropEvent]) -> None:
+    async for _, event in resources.price_drops.consume(block_seconds=0.1):
+        received.append(event)
+
+
+async def run(args: argparse.Namespace) -> bool:
+    retailers = [
+        FakeRetailer(host=f"127.0.0.{i + 2}", latency=args.latency).start()
+        for i in range(args.domains)
+    ]
+    try:
+        await DB.init_db()
+        async with open_resources() as resources:
+            expected_drops = await seed(retailers, args.pages)
+            watcher = watch.PriceWatcher(
+                resources,
+                interval_seconds=0,
+                batch_size=args.batch_size,
+                max_in_flight=args.max_in_flight,
+                domain_concurrency=args.domain_concurrency,
+                domain_delay_seconds=args.domain_delay,
+            )
+            received: list[schemas.PriceDropEvent] = []
+            consumer = asyncio.create_task(consume(resources, received))
+
+            with DB.count_statements() as counter:
+                start = time.perf_counter()
+                report = await watcher.run_once()
+                elapsed = time.perf_counter() - start
+            deadline = time.perf_counter() + 5
+            while len(received) < report.drops and time.perf_counter() < deadline:
+                await asyncio.sleep(0.05)
+            consumer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await consumer
+    finally:
+        for retailer in retailers:
+            retailer.stop()
+
+    print(
+        f"{report.checked} of {args.pages} pages over {args.domains} domains "
+        f"in {elapsed:.1f}s, {report.checked / elapsed:.1f} pages/s"
+    )
+    print(
+        f"{counter.count} statements, {counter.count / args.pages:.3f} per page "
+        f"(batch size {args.batch_size})"
+    )
+    print(
+        f"{report.changed} changed, {report.drops} drops published, "
+        f"{len(received)} consumed, {expected_drops} expected, "
+        f"{report.failed} failed"
+    )
+    return report.checked == args.pages and len(received) == expected_drops
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--domains", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--max-in-flight", type=int, default=200)
+    parser.add_argument("--domain-concurrency", type=int, default=4)
+    parser.add_argument("--domain-delay", type=float, default=0.0, help="seconds")
+    args = parser.parse_args()
+
+    if not asyncio.run(run(args)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
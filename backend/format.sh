@@ -2,4 +2,4 @@
 
 set -e
 
-python -m black main.py itemize/
\ No newline at end of file
+python -m black main.py gunicorn.conf.py itemize/ bench/
\ No newline at end of file
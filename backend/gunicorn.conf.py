@@ -0,0 +1,59 @@
+"""
+Gunicorn settings for running several uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Workers are started from a fresh import of main, not forked from a preloaded
+app, so every worker opens its own database pool, HTTP client and executors.
+Send SIGHUP to the master for a graceful reload: new workers are started and
+the old ones finish their in-flight requests before exiting.
+"""
+import os
+import shutil
+import subprocess
+import sys
+
+from typing import Any
+
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = False
+timeout = int(os.environ.get("WORKER_TIMEOUT_SECONDS", "60"))
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT_SECONDS", "30"))
+keepalive = 5
+# recycle workers now and then so memory held by parsed pages is returned,
+# with jitter so they do not all restart at once; the garbage collector keeps
+# its schedule in the database and the price watcher runs a pass on start, so
+# recycling does not starve them, but keep a worker's lifetime well above
+# SCHEDULE_POLL_SECONDS
+max_requests = int(os.environ.get("WORKER_MAX_REQUESTS", "10000"))
+max_requests_jitter = max_requests // 10
+forwarded_allow_ips = os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1")
+accesslog = None
+
+INIT_DB = "import asyncio; from itemize.db import DB; asyncio.run(DB.init_db())"
+
+
+def on_starting(server: Any) -> None:
+    # every worker writes its metrics to files here and /metrics aggregates
+    # them, a fresh directory per master so counters from old runs are dropped
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir)
+
+    # create (or drop) the tables once, before any worker exists, instead of
+    # having every worker race to do it; workers inherit the env and skip it
+    env = {k: v for k, v in os.environ.items() if k != "PROMETHEUS_MULTIPROC_DIR"}
+    subprocess.run([sys.executable, "-c", INIT_DB], env=env, check=True)
+    os.environ["TABLE_CREATE_ON_STARTUP"] = "false"
+    os.environ["TABLE_DROP_ON_STARTUP"] = "false"
+
+
+def child_exit(server: Any, worker: Any) -> None:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)  # type: ignore[no-untyped-call]
@@ -1,10 +1,12 @@
 import jwt
+import secrets
 
 from itemize import schemas
-from itemize import models
+from itemize import users
 
 from itemize.config import CONFIG
 from itemize.db import DB as _DB
+from itemize.resources import Resources as _Resources
 
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
@@ -18,16 +20,28 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/login")
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with _DB.async_session() as session:
+    async with _DB.session() as session:
         yield session
 
 
 DB = Annotated[AsyncSession, Depends(get_db)]
 
 
+def get_resources(request: Request) -> _Resources:
+    resources: _Resources = request.state.resources
+    return resources
+
+
+Resources = Annotated[_Resources, Depends(get_resources)]
+
+
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)], session: DB
-) -> schemas.User:
+) -> schemas.AuthUser:
+    """
+    Identify the caller from the signed token claims. Only the token version
+    is checked against the database, and that check is cached briefly.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -37,23 +51,40 @@ async def get_current_user(
         payload = jwt.decode(
             token, CONFIG.JWT_SECRET, algorithms=[CONFIG.JWT_ALGORITHM]
         )
-        user_id = payload.get("sub")
-        if not isinstance(user_id, int):
-            raise credentials_exception
-        user = await session.get(models.User, user_id)
-        if user is None:
-            raise credentials_exception
-        return await user.to_schema()
     except jwt.PyJWTError:
         raise credentials_exception
 
+    user_id = payload.get("sub")
+    username = payload.get("username")
+    email = payload.get("email")
+    # tokens issued before versioning count as version 0
+    token_version = payload.get("ver", 0)
+    if (
+        not isinstance(user_id, int)
+        or not isinstance(username, str)
+        or not isinstance(email, str)
+        or not isinstance(token_version, int)
+    ):
+        raise credentials_exception
+
+    if await users.get_token_version(session, user_id) != token_version:
+        raise credentials_exception
+    return schemas.AuthUser(id=user_id, username=username, email=email)
+
+
+CurrentUser = Annotated[schemas.AuthUser, Depends(get_current_user)]
 
-CurrentUser = Annotated[schemas.User, Depends(get_current_user)]
+
+async def get_current_user_record(user: CurrentUser, session: DB) -> schemas.User:
+    return await users.get_user(session, user.id)
+
+
+CurrentUserRecord = Annotated[schemas.User, Depends(get_current_user_record)]
 
 
 async def get_current_user_if_authenticated(
     request: Request, session: DB
-) -> schemas.User | None:
+) -> schemas.AuthUser | None:
     try:
         token = await oauth2_scheme(request)
         if token is None:
@@ -64,7 +95,7 @@ async def get_current_user_if_authenticated(
 
 
 CurrentUserIfAuthenticated = Annotated[
-    schemas.User | None, Depends(get_current_user_if_authenticated)
+    schemas.AuthUser | None, Depends(get_current_user_if_authenticated)
 ]
 
 
@@ -77,3 +108,24 @@ async def match_username_slug(request: Request, user: CurrentUser) -> None:
 
 
 MatchUsernameSlug = Depends(match_username_slug)
+
+
+async def require_system_token(request: Request) -> None:
+    """
+    Guard for operational endpoints, which are not for users: they answer 404
+    unless SYSTEM_TOKEN is set, and then only to that bearer token.
+    """
+    if CONFIG.SYSTEM_TOKEN is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(
+        token.encode(), CONFIG.SYSTEM_TOKEN.get_secret_value().encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+RequireSystemToken = Depends(require_system_token)
@@ -1,11 +1,25 @@
+from itemize import cache
 from itemize import itemize
+from itemize import metrics
 from itemize import schemas
 
-from itemize.api._deps import MatchUsernameSlug, DB, CurrentUserIfAuthenticated
+from itemize.api._deps import (
+    MatchUsernameSlug,
+    DB,
+    CurrentUserIfAuthenticated,
+    Resources,
+)
+from itemize.config import CONFIG
+from itemize.errors import ImportTooLargeError
 
-from fastapi import APIRouter, Body
+from datetime import datetime
+from decimal import Decimal
+from urllib.parse import urlencode
 
-from typing import Annotated
+from fastapi import APIRouter, Body, Header, Query, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+
+from typing import Annotated, AsyncIterator
 
 router = APIRouter(prefix="/itemize")
 
@@ -34,18 +48,64 @@ async def create_itemize(
     return schemas.CreateItemizeResponse(itemize=itemize_)
 
 
-@router.get("/{username}/{itemize_slug}")
+def cached_response(
+    cached: cache.CachedResponse, if_none_match: str | None
+) -> Response:
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if if_none_match is not None and cached.matches(if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+@router.get("/{username}/{itemize_slug}", response_model=schemas.GetItemizeResponse)
 async def get_itemize(
     username: str,
     itemize_slug: str,
     session: DB,
     user: CurrentUserIfAuthenticated,
+    resources: Resources,
     query: str | None = None,
-) -> schemas.GetItemizeResponse:
+    sort: schemas.LinkSort = "created_at",
+    order: schemas.SortOrder = "asc",
+    min_price: Decimal | None = None,
+    max_price: Decimal | None = None,
+    currency: Annotated[str | None, Query(min_length=3, max_length=3)] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
+    # only public itemizes are cached, and those render the same for everyone;
+    # each sort order is a field of the itemize's entry, searches and price
+    # filters are not cached so clients cannot add fields without limit
+    key = cache.itemize_key(username, itemize_slug)
+    field = urlencode({"sort": sort, "order": order})
+    cacheable = all(p is None for p in (query, min_price, max_price, currency))
+    if cacheable:
+        cached = await resources.response_cache.get_response(key, field)
+        metrics.record_cache("itemize_response", cached is not None)
+        if cached is not None:
+            return cached_response(cached, if_none_match)
+    # read before the itemize, a change committed after it bumps the
+    # generation and the render below is not cached
+    generation = await resources.response_cache.get_generation(key)
+
     itemize_ = await itemize.get_itemize(
-        session, user, username=username, slug=itemize_slug, query=query
+        session,
+        user,
+        username=username,
+        slug=itemize_slug,
+        query=query,
+        sort=sort,
+        order=order,
+        min_price=min_price,
+        max_price=max_price,
+        currency=currency,
     )
-    return schemas.GetItemizeResponse(itemize=itemize_)
+    with metrics.time_stage("render"):
+        body = schemas.GetItemizeResponse(itemize=itemize_).model_dump_json().encode()
+    if not itemize_.public or not cacheable:
+        return Response(content=body, media_type="application/json")
+
+    cached = await resources.response_cache.set_response(key, field, body, generation)
+    return cached_response(cached, if_none_match)
 
 
 @router.patch("/{username}/{itemize_slug}", dependencies=[MatchUsernameSlug])
@@ -54,6 +114,7 @@ async def update_itemize(
     itemize_slug: str,
     req: Annotated[schemas.UpdateItemizeRequest, Body()],
     session: DB,
+    resources: Resources,
 ) -> schemas.UpdateItemizeResponse:
     itemize_ = await itemize.update_itemize(
         session,
@@ -62,14 +123,18 @@ async def update_itemize(
         name=req.name,
         description=req.description,
         public=req.public,
+        resources=resources,
     )
     return schemas.UpdateItemizeResponse(itemize=itemize_)
 
 
 @router.delete("/{username}/{itemize_slug}", dependencies=[MatchUsernameSlug])
-async def delete_itemize(username: str, itemize_slug: str) -> None:
-    # TODO
-    pass
+async def delete_itemize(
+    username: str, itemize_slug: str, session: DB, resources: Resources
+) -> None:
+    await itemize.delete_itemize(
+        session, username=username, slug=itemize_slug, resources=resources
+    )
 
 
 @router.post("/{username}/{itemize_slug}", dependencies=[MatchUsernameSlug])
@@ -78,9 +143,10 @@ async def create_link(
     itemize_slug: str,
     req: Annotated[schemas.CreateLinkRequest, Body()],
     session: DB,
+    resources: Resources,
 ) -> schemas.CreateLinkResponse:
     link = await itemize.create_link(
-        session, username=username, slug=itemize_slug, url=req.url
+        session, username=username, slug=itemize_slug, url=req.url, resources=resources
     )
 
     return schemas.CreateLinkResponse(link=link)
@@ -93,6 +159,7 @@ async def update_link_metadata(
     link_id: int,
     req: Annotated[schemas.UpdateLinkMetadataRequest, Body()],
     session: DB,
+    resources: Resources,
 ) -> schemas.UpdateLinkMetadataResponse:
     link = await itemize.update_link_metadata(
         session,
@@ -105,14 +172,100 @@ async def update_link_metadata(
         site_name=req.site_name,
         price=req.price,
         currency=req.currency,
+        resources=resources,
     )
     return schemas.UpdateLinkMetadataResponse(link=link)
 
 
+@router.get("/{username}/{itemize_slug}/{link_id}/prices")
+async def get_link_prices(
+    username: str,
+    itemize_slug: str,
+    link_id: int,
+    session: DB,
+    user: CurrentUserIfAuthenticated,
+    since: datetime | None = None,
+) -> schemas.GetLinkPricesResponse:
+    prices = await itemize.get_link_prices(
+        session,
+        user,
+        username=username,
+        slug=itemize_slug,
+        link_id=link_id,
+        since=since,
+    )
+    return schemas.GetLinkPricesResponse(prices=prices)
+
+
 @router.delete("/{username}/{itemize_slug}/{link_id}", dependencies=[MatchUsernameSlug])
 async def delete_link(
-    username: str, itemize_slug: str, link_id: int, session: DB
+    username: str, itemize_slug: str, link_id: int, session: DB, resources: Resources
 ) -> None:
     await itemize.delete_link(
-        session, username=username, slug=itemize_slug, link_id=link_id
+        session,
+        username=username,
+        slug=itemize_slug,
+        link_id=link_id,
+        resources=resources,
+    )
+
+
+def ndjson_response(events: AsyncIterator[itemize.ImportEvent]) -> StreamingResponse:
+    async def lines() -> AsyncIterator[str]:
+        async for event in events:
+            yield event.model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post(
+    "/{username}/{itemize_slug}/import",
+    dependencies=[MatchUsernameSlug],
+    response_class=StreamingResponse,
+)
+async def import_links(
+    username: str,
+    itemize_slug: str,
+    req: Annotated[schemas.ImportLinksRequest, Body()],
+    session: DB,
+    resources: Resources,
+) -> StreamingResponse:
+    events = await itemize.import_links(
+        session,
+        username=username,
+        slug=itemize_slug,
+        urls=req.urls,
+        resources=resources,
+    )
+    return ndjson_response(events)
+
+
+@router.post(
+    "/{username}/{itemize_slug}/import/file",
+    dependencies=[MatchUsernameSlug],
+    response_class=StreamingResponse,
+)
+async def import_links_file(
+    username: str,
+    itemize_slug: str,
+    file: UploadFile,
+    session: DB,
+    resources: Resources,
+) -> StreamingResponse:
+    # read no more than the limit, the URL count is only known once parsed
+    data = await file.read(CONFIG.IMPORT_MAX_FILE_BYTES + 1)
+    if len(data) > CONFIG.IMPORT_MAX_FILE_BYTES:
+        raise ImportTooLargeError(
+            f"Cannot import files larger than {CONFIG.IMPORT_MAX_FILE_BYTES} bytes!"
+        )
+    # one url per line, blank lines and # comments are skipped
+    text = data.decode("utf-8", errors="replace")
+    urls = [
+        line.split()[0]
+        for line in text.splitlines()
+        if line.strip() and not line.lstrip().startswith("#")
+    ]
+    events = await itemize.import_links(
+        session, username=username, slug=itemize_slug, urls=urls, resources=resources
     )
+    return ndjson_response(events)
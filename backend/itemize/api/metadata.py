@@ -1,33 +1,27 @@
-import asyncio
+import functools
 import itemize.schemas as schemas
 
 from itemize import metadata
 from itemize import errors
 
-from itemize.api._deps import CurrentUser, DB
+from itemize.api._deps import CurrentUser, DB, Resources
+from itemize.db import DB as _DB
 
 from fastapi import APIRouter, Response
-from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/metadata")
 
 
-async def append_metadata_list(
-    session: AsyncSession, metadatas: list[schemas.PageMetadata], url: str
-) -> None:
-    if (data := await metadata.get_metadata(session, url)) is not None:
-        metadatas.append(data)
-
-
 @router.post("")
 async def get_metadata_for_urls(
-    request: schemas.PageMetadataRequest, _: CurrentUser, session: DB
+    request: schemas.PageMetadataRequest, _: CurrentUser, resources: Resources
 ) -> schemas.PageMetadataResponse:
-    metadatas: list[schemas.PageMetadata] = []
-    async with asyncio.TaskGroup() as tg:
-        for url in request.urls:
-            tg.create_task(append_metadata_list(session, metadatas, url))
-    return schemas.PageMetadataResponse(metadatas=metadatas)
+    metadatas = await _DB.map_in_sessions(
+        functools.partial(metadata.get_metadata, resources=resources), request.urls
+    )
+    return schemas.PageMetadataResponse(
+        metadatas=[data for data in metadatas if data is not None]
+    )
 
 
 @router.get("/images/{id}")
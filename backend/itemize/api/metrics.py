@@ -0,0 +1,29 @@
+import os
+
+from itemize import metrics
+
+from itemize.api._deps import RequireSystemToken
+from itemize.db import DB as _DB
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest
+from prometheus_client import multiprocess
+
+
+router = APIRouter(dependencies=[RequireSystemToken])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics() -> Response:
+    pool = _DB.pool_status()
+    for state in ("checked_in", "checked_out", "overflow"):
+        value = getattr(pool, state)
+        if value is not None:
+            metrics.DB_POOL_CONNECTIONS.labels(state).set(value)
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+    # several server workers, add up what each of them wrote
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)  # type: ignore[no-untyped-call]
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,14 @@
+from itemize import schemas
+
+from itemize.api._deps import RequireSystemToken
+from itemize.db import DB as _DB
+
+from fastapi import APIRouter
+
+
+router = APIRouter(prefix="/system", dependencies=[RequireSystemToken])
+
+
+@router.get("/db")
+async def get_db_pool_status() -> schemas.DBPoolStatus:
+    return _DB.pool_status()
@@ -4,19 +4,23 @@ from itemize import schemas
 from itemize import users
 from itemize import errors
 
-from itemize.api._deps import DB
+from itemize.api._deps import DB, CurrentUser, CurrentUserRecord, Resources
 
 from fastapi import APIRouter, Body, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import Annotated
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/users")
 
 
 @router.post("")
 async def create_user(
-    req: Annotated[schemas.CreateUserRequest, Body()], session: DB
+    req: Annotated[schemas.CreateUserRequest, Body()],
+    session: DB,
+    resources: Resources,
 ) -> schemas.CreateUserResponse:
     await users.create_user(
         session,
@@ -25,8 +29,11 @@ async def create_user(
         password=req.password,
         first_name=req.first_name,
         last_name=req.last_name,
+        resources=resources,
+    )
+    token, user = await users.login_user(
+        session, req.username, req.password, resources=resources
     )
-    token, user = await users.login_user(session, req.username, req.password)
 
     return schemas.CreateUserResponse(user=user, token=token)
 
@@ -34,7 +41,10 @@ async def create_user(
 @router.get("/check/{username_or_email}")
 async def check_username_or_email(username_or_email: str, session: DB) -> None:
     is_email = users.is_email(username_or_email)
-    logging.debug(f"{username_or_email} is email: {is_email}")
+    logger.debug(
+        "Checked username or email",
+        extra={"username_or_email": username_or_email, "is_email": is_email},
+    )
     if not is_email and await users.check_username_exists(session, username_or_email):
         raise errors.UserExistsError("Username already exists!")
     elif is_email and await users.check_email_exists(session, username_or_email):
@@ -43,8 +53,22 @@ async def check_username_or_email(username_or_email: str, session: DB) -> None:
 
 @router.post("/login")
 async def login_user(
-    req: Annotated[OAuth2PasswordRequestForm, Depends()], session: DB
+    req: Annotated[OAuth2PasswordRequestForm, Depends()],
+    session: DB,
+    resources: Resources,
 ) -> schemas.Token:
-    token, _ = await users.login_user(session, req.username, req.password)
+    token, _ = await users.login_user(
+        session, req.username, req.password, resources=resources
+    )
 
     return schemas.Token(access_token=token)
+
+
+@router.get("/me")
+async def get_me(user: CurrentUserRecord) -> schemas.User:
+    return user
+
+
+@router.post("/revoke")
+async def revoke_tokens(user: CurrentUser, session: DB) -> None:
+    await users.revoke_tokens(session, user.id)
@@ -0,0 +1,61 @@
+"""
+Shared headless browser for page screenshots.
+
+Launching Chromium costs far more than rendering one page, so a single browser
+is launched on the first screenshot and reused, with a bounded number of pages
+open at once. pyppeteer is only imported when that first screenshot happens.
+"""
+import asyncio
+import logging
+
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserPool:
+    def __init__(self, *, max_pages: int) -> None:
+        self._browser: Any = None
+        self._lock = asyncio.Lock()
+        self._pages = asyncio.Semaphore(max_pages)
+
+    async def _get_browser(self) -> Any:
+        async with self._lock:
+            if self._browser is None:
+                import pyppeteer
+
+                # the app closes the browser on shutdown, so pyppeteer must not
+                # install its own signal handlers
+                self._browser = await pyppeteer.launch(
+                    handleSIGINT=False, handleSIGTERM=False, handleSIGHUP=False
+                )
+            return self._browser
+
+    async def screenshot(self, url: str) -> bytes:
+        async with self._pages:
+            browser = await self._get_browser()
+            try:
+                page = await browser.newPage()
+            except Exception:
+                # the browser died underneath us, relaunch on the next call
+                await self.close()
+                raise
+            try:
+                await page.goto(url)
+                screenshot = await page.screenshot({"type": "jpeg"})
+            finally:
+                await page.close()
+        if isinstance(screenshot, str):
+            return screenshot.encode("utf-8")
+        return bytes(screenshot)
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._browser is None:
+                return
+            try:
+                await self._browser.close()
+            except Exception:
+                logger.exception("Failed to close browser")
+            self._browser = None
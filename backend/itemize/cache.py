@@ -0,0 +1,300 @@
+import abc
+import hashlib
+import logging
+import time
+
+from itemize import models
+
+from itemize.config import CONFIG
+
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from typing import Any, Protocol
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedResponse:
+    etag: str
+    body: bytes
+
+    @staticmethod
+    def from_body(body: bytes) -> "CachedResponse":
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        return CachedResponse(etag=f'"{digest}"', body=body)
+
+    def matches(self, if_none_match: str) -> bool:
+        """
+        Whether an If-None-Match header lists this response's ETag, compared
+        weakly as RFC 9110 asks for that header.
+        """
+        if if_none_match.strip() == "*":
+            return True
+        return any(
+            tag.strip().removeprefix("W/") == self.etag
+            for tag in if_none_match.split(",")
+        )
+
+    def encode(self) -> bytes:
+        return self.etag.encode("ascii") + b"\n" + self.body
+
+    @staticmethod
+    def decode(value: bytes) -> "CachedResponse":
+        etag, _, body = value.partition(b"\n")
+        return CachedResponse(etag=etag.decode("ascii"), body=body)
+
+
+class ResponseCache(abc.ABC):
+    """
+    Rendered response cache.
+
+    Entries are grouped under a key (one per itemize) with one field per
+    variant of the response (e.g. the search query), so that invalidating a
+    key drops every variant at once.
+
+    Deleting a key also bumps its generation. A response is rendered from
+    data read after get_generation and only stored if the generation has not
+    changed since, so a render that raced an invalidation cannot put the old
+    data back.
+    """
+
+    @abc.abstractmethod
+    async def get(self, key: str, field: str) -> bytes | None:
+        ...
+
+    @abc.abstractmethod
+    async def get_generation(self, key: str) -> int:
+        ...
+
+    @abc.abstractmethod
+    async def set(self, key: str, field: str, value: bytes, generation: int) -> bool:
+        """
+        Store the value unless the key was deleted since generation was read.
+        """
+
+    @abc.abstractmethod
+    async def delete(self, *keys: str) -> None:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+    async def get_response(self, key: str, field: str) -> CachedResponse | None:
+        value = await self.get(key, field)
+        if value is None:
+            return None
+        return CachedResponse.decode(value)
+
+    async def set_response(
+        self, key: str, field: str, body: bytes, generation: int
+    ) -> CachedResponse:
+        response = CachedResponse.from_body(body)
+        if not await self.set(key, field, response.encode(), generation):
+            logger.debug("Not caching a stale response", extra={"key": key})
+        return response
+
+
+class NullResponseCache(ResponseCache):
+    async def get(self, key: str, field: str) -> bytes | None:
+        return None
+
+    async def get_generation(self, key: str) -> int:
+        return 0
+
+    async def set(self, key: str, field: str, value: bytes, generation: int) -> bool:
+        return False
+
+    async def delete(self, *keys: str) -> None:
+        pass
+
+
+class MemoryResponseCache(ResponseCache):
+    def __init__(self, *, ttl_seconds: int, max_entries: int) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, dict[str, tuple[float, bytes]]] = OrderedDict()
+        # generations are ticks of one clock, a key's is the tick it was last
+        # deleted at; keys beyond max_entries are forgotten, and any
+        # generation older than the newest forgotten one is treated as stale
+        self._clock = 0
+        self._deleted_at: OrderedDict[str, int] = OrderedDict()
+        self._forgotten_at = 0
+
+    async def get(self, key: str, field: str) -> bytes | None:
+        fields = self._entries.get(key)
+        if fields is None or field not in fields:
+            return None
+        expires_at, value = fields[field]
+        if expires_at < time.monotonic():
+            del fields[field]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def get_generation(self, key: str) -> int:
+        return self._clock
+
+    async def set(self, key: str, field: str, value: bytes, generation: int) -> bool:
+        if max(self._deleted_at.get(key, 0), self._forgotten_at) > generation:
+            return False
+        fields = self._entries.setdefault(key, {})
+        fields[field] = (time.monotonic() + self._ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+        return True
+
+    async def delete(self, *keys: str) -> None:
+        self._clock += 1
+        for key in keys:
+            self._entries.pop(key, None)
+            self._deleted_at[key] = self._clock
+            self._deleted_at.move_to_end(key)
+        while len(self._deleted_at) > self._max_entries:
+            _, self._forgotten_at = self._deleted_at.popitem(last=False)
+
+
+class RedisClient(Protocol):
+    """
+    Subset of the redis.asyncio.Redis interface used by the cache, so any
+    Redis compatible client (or a local stub) can back it.
+    """
+
+    async def get(self, name: str) -> Any:
+        ...
+
+    async def hget(self, name: str, key: str) -> Any:
+        ...
+
+    async def incr(self, name: str) -> Any:
+        ...
+
+    async def expire(self, name: str, time: int) -> Any:
+        ...
+
+    async def eval(self, script: str, numkeys: int, *keys_and_args: Any) -> Any:
+        ...
+
+    async def delete(self, *names: str) -> Any:
+        ...
+
+    async def aclose(self) -> Any:
+        ...
+
+
+# HSET the entry only if the generation is still the one read; the TTL is set
+# by the first field only, so no field outlives it however many follow
+_SET_IF_GENERATION = """
+if (redis.call("GET", KEYS[2]) or "0") ~= ARGV[1] then
+    return 0
+end
+redis.call("HSET", KEYS[1], ARGV[2], ARGV[3])
+if redis.call("TTL", KEYS[1]) < 0 then
+    redis.call("EXPIRE", KEYS[1], ARGV[4])
+end
+return 1
+"""
+
+
+class RedisResponseCache(ResponseCache):
+    def __init__(self, client: RedisClient, *, ttl_seconds: int) -> None:
+        self._client = client
+        self._ttl_seconds = ttl_seconds
+
+    async def get(self, key: str, field: str) -> bytes | None:
+        value = await self._client.hget(key, field)
+        if value is None:
+            return None
+        return bytes(value)
+
+    async def get_generation(self, key: str) -> int:
+        return int(await self._client.get(generation_key(key)) or 0)
+
+    async def set(self, key: str, field: str, value: bytes, generation: int) -> bool:
+        stored = await self._client.eval(
+            _SET_IF_GENERATION,
+            2,
+            key,
+            generation_key(key),
+            generation,
+            field,
+            value,
+            self._ttl_seconds,
+        )
+        return bool(stored)
+
+    async def delete(self, *keys: str) -> None:
+        # bump before deleting, so a render that read the old generation cannot
+        # store it after; an expired generation reads as 0, which a render
+        # that read the old one does not match either
+        for key in keys:
+            await self._client.incr(generation_key(key))
+            await self._client.expire(generation_key(key), self._ttl_seconds)
+        if keys:
+            await self._client.delete(*keys)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def create_response_cache() -> ResponseCache:
+    match CONFIG.RESPONSE_CACHE_BACKEND:
+        case "memory" if CONFIG.WEB_CONCURRENCY > 1:
+            # invalidations would only reach the worker that made the change
+            logger.warning(
+                "The memory response cache is per worker, disabling it with "
+                "several workers; use the redis backend to share it"
+            )
+            return NullResponseCache()
+        case "memory":
+            return MemoryResponseCache(
+                ttl_seconds=CONFIG.RESPONSE_CACHE_TTL_SECONDS,
+                max_entries=CONFIG.RESPONSE_CACHE_MAX_ENTRIES,
+            )
+        case "redis":
+            import redis.asyncio
+
+            return RedisResponseCache(
+                redis.asyncio.Redis.from_url(CONFIG.RESPONSE_CACHE_URL),
+                ttl_seconds=CONFIG.RESPONSE_CACHE_TTL_SECONDS,
+            )
+        case "none":
+            return NullResponseCache()
+        case backend:
+            raise ValueError(f"Unknown response cache backend: {backend}")
+
+
+def itemize_key(username: str, slug: str) -> str:
+    return f"itemize:{username}:{slug}"
+
+
+def generation_key(key: str) -> str:
+    return f"{key}:generation"
+
+
+async def invalidate_itemize(
+    response_cache: ResponseCache, username: str, *slugs: str
+) -> None:
+    await response_cache.delete(*(itemize_key(username, slug) for slug in slugs))
+
+
+async def invalidate_page_metadata(
+    session: AsyncSession, response_cache: ResponseCache, *page_metadata_ids: int
+) -> None:
+    rows = await session.execute(
+        select(models.User.username, models.Itemize.slug)
+        .select_from(models.Link)
+        .join(models.Itemize)
+        .join(models.User)
+        .where(models.Link.page_metadata_id.in_(page_metadata_ids))
+        .distinct()
+    )
+    await response_cache.delete(
+        *(itemize_key(username, slug) for username, slug in rows)
+    )
@@ -0,0 +1,146 @@
+"""
+Garbage collection of rows no link refers to any more.
+
+Page metadata and images are shared between links, so deleting a link or an
+itemize leaves them behind. The collector finds rows whose reference count has
+dropped to zero with NOT EXISTS anti-joins over the foreign key indexes and
+deletes them in batches, so no single transaction holds locks for long. The
+same pass downsamples old price history, see history.py.
+"""
+import asyncio
+import logging
+
+from itemize import history
+from itemize import models
+from itemize import schedule
+from itemize import schemas
+
+from itemize.config import CONFIG
+from itemize.db import DB
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, exists, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+logger = logging.getLogger(__name__)
+
+_task: asyncio.Task[None] | None = None
+
+
+async def collect_garbage(
+    session: AsyncSession, *, batch_size: int | None = None
+) -> schemas.GarbageCollectionReport:
+    batch_size = batch_size or CONFIG.GC_BATCH_SIZE
+    # rows touched recently may be about to be linked, e.g. metadata fetched
+    # by a create_link that has not inserted its link yet
+    cutoff = datetime.utcnow() - timedelta(seconds=CONFIG.GC_GRACE_SECONDS)
+    report = schemas.GarbageCollectionReport()
+
+    # every DELETE repeats the conditions, a row selected as unused may have
+    # been linked or reused in between
+    is_unused_override = and_(
+        ~exists().where(
+            models.Link.page_metadata_override_id == models.PageMetadataOverride.id
+        ),
+        models.PageMetadataOverride.updated_at < cutoff,
+    )
+    unused_overrides = (
+        select(models.PageMetadataOverride.id)
+        .where(is_unused_override)
+        .limit(batch_size)
+    )
+    while ids := list(await session.scalars(unused_overrides)):
+        deleted = await session.execute(
+            delete(models.PageMetadataOverride).where(
+                models.PageMetadataOverride.id.in_(ids), is_unused_override
+            )
+        )
+        await session.commit()
+        report.overrides += deleted.rowcount
+
+    is_unused_metadata = and_(
+        ~exists().where(models.Link.page_metadata_id == models.PageMetadata.id),
+        models.PageMetadata.updated_at < cutoff,
+    )
+    unused_metadata = (
+        select(models.PageMetadata.id).where(is_unused_metadata).limit(batch_size)
+    )
+    while ids := list(await session.scalars(unused_metadata)):
+        still_unused = select(models.PageMetadata.id).where(
+            models.PageMetadata.id.in_(ids), is_unused_metadata
+        )
+        observations = await session.execute(
+            delete(models.PriceObservation).where(
+                models.PriceObservation.page_metadata_id.in_(still_unused)
+            )
+        )
+        deleted = await session.execute(
+            delete(models.PageMetadata).where(
+                models.PageMetadata.id.in_(ids), is_unused_metadata
+            )
+        )
+        await session.commit()
+        report.page_metadata += deleted.rowcount
+        report.price_observations += observations.rowcount
+
+    is_unused_image = and_(
+        ~exists().where(models.PageMetadata.image_id == models.MetadataImage.id),
+        ~exists().where(
+            models.PageMetadataOverride.image_id == models.MetadataImage.id
+        ),
+        models.MetadataImage.updated_at < cutoff,
+    )
+    unused_images = (
+        select(
+            models.MetadataImage.id,
+            func.coalesce(func.length(models.MetadataImage.data), 0),
+        )
+        .where(is_unused_image)
+        .limit(batch_size)
+    )
+    while rows := list(await session.execute(unused_images)):
+        collected = await session.execute(
+            delete(models.MetadataImage)
+            .where(models.MetadataImage.id.in_([id for id, _ in rows]), is_unused_image)
+            .returning(models.MetadataImage.id)
+        )
+        deleted_ids = set(collected.scalars())
+        await session.commit()
+        report.images += len(deleted_ids)
+        report.bytes_reclaimed += sum(size for id, size in rows if id in deleted_ids)
+
+    report.price_observations_downsampled = await history.downsample(
+        session, batch_size=batch_size
+    )
+    return report
+
+
+async def run_garbage_collector() -> None:
+    async def collect() -> None:
+        async with DB.session() as session:
+            report = await collect_garbage(session)
+        logger.info("Garbage collection finished", extra=report.model_dump())
+
+    # one worker collects per interval, however often workers restart
+    await schedule.run_periodically(
+        "garbage_collector", CONFIG.GC_INTERVAL_SECONDS, collect
+    )
+
+
+def start() -> None:
+    global _task
+    if CONFIG.GC_INTERVAL_SECONDS > 0 and _task is None:
+        _task = asyncio.create_task(run_garbage_collector())
+
+
+async def stop() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
@@ -1,21 +1,83 @@
 import logging
 
+from pydantic import SecretStr
 from pydantic_settings import BaseSettings
 
 
 class Config(BaseSettings):
     DB_URI: str = "sqlite+aiosqlite:///./db.sqlite3"
-    ECHO_SQL: bool = True
+    ECHO_SQL: bool = False
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 60 * 30
+    DB_POOL_PRE_PING: bool = True
+    DB_FANOUT_CONCURRENCY: int = 5  # sessions per batch, keep within the pool size
+    DB_QUERY_CACHE_SIZE: int = 500  # compiled SQL cache per engine
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg prepared statements, 0 for pgbouncer
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_FOREIGN_KEYS: bool = True  # enforced per connection, checked on startup
     TABLE_CREATE_ON_STARTUP: bool = True
     TABLE_DROP_ON_STARTUP: bool = False
+    WEB_CONCURRENCY: int = 1  # server worker processes, see gunicorn.conf.py
     JWT_SECRET: str = "secret"  # openssl rand -hex 32
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRATION_MINUTES: int = 60 * 24 * 30
+    AUTH_CACHE_TTL_SECONDS: int = 30  # how long a revoked token may still be accepted
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    PASSWORD_HASH_ROUNDS: int = 12  # bcrypt work factor, rehashed on login if changed
+    PASSWORD_HASH_WORKERS: int = 2
+    SYSTEM_TOKEN: SecretStr | None = None  # for /system and /metrics, unset hides them
     PARSER_LOG_PAGEDATA: bool = True
+    PARSER_PLUGINS: list[str] = []  # modules exposing EXTRACTORS, see extractors.py
     SERVER_URL: str = "http://localhost:8000"
     LOG_LEVEL: str = "INFO"
-    LOG_FORMAT: str = logging.BASIC_FORMAT
+    LOG_FORMAT: str = logging.BASIC_FORMAT  # ignored with LOG_JSON
+    LOG_JSON: bool = False
+    LOG_LEVELS: dict[str, str] = {  # per logger overrides
+        "aiosqlite": "WARNING",
+        "httpx": "WARNING",
+    }
+    LOG_SAMPLE_RATE: float = 0.01  # share of verbose payloads that are logged
+    LOG_MAX_FIELD_LENGTH: int = 2048
+    LOG_QUEUE_SIZE: int = 10000
     SCREENSHOT_PAGE: bool = False
+    BROWSER_MAX_PAGES: int = 2
+    FETCH_TIMEOUT_SECONDS: float = 5.0
+    FETCH_MAX_CONNECTIONS: int = 100
+    FETCH_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    PARSER_WORKERS: int = 2  # extruct processes per server worker, 0 for in-loop
+    USER_AGENTS_PER_BROWSER: int = 5  # size of the header profile pool
+    USER_AGENT_MAX_DOMAINS: int = 10000
+    IMPORT_MAX_URLS: int = 1000
+    IMPORT_MAX_FILE_BYTES: int = 1024 * 1024  # uploads are read up to this much
+    IMPORT_CONCURRENCY: int = 8
+    IMPORT_BATCH_SIZE: int = 50
+    GC_INTERVAL_SECONDS: int = 60 * 60  # 0 disables the garbage collector
+    GC_GRACE_SECONDS: int = 60 * 60 * 24
+    GC_BATCH_SIZE: int = 500
+    SCHEDULE_POLL_SECONDS: int = 60  # how often workers look for a due job run
+    PRICE_HISTORY_FLUSH_SECONDS: float = 5.0
+    PRICE_HISTORY_BATCH_SIZE: int = 500  # flush early once this many are pending
+    PRICE_HISTORY_MAX_PENDING: int = 10000  # kept while the database is unavailable
+    PRICE_HISTORY_RAW_DAYS: int = 30  # older runs are merged into one per day
+    WATCH_INTERVAL_SECONDS: int = 60 * 60 * 6  # 0 disables the price watcher
+    WATCH_BATCH_SIZE: int = 500  # pages claimed per query and changes per write
+    WATCH_MAX_IN_FLIGHT: int = 200  # pages queued or being fetched per worker
+    WATCH_DOMAIN_CONCURRENCY: int = 1  # fetches per domain at a time
+    WATCH_DOMAIN_DELAY_SECONDS: float = 1.0  # pause after each fetch from a domain
+    WATCH_EVENTS_BACKEND: str = "memory"  # memory, redis or none
+    WATCH_EVENTS_URL: str = "redis://localhost:6379/0"
+    WATCH_EVENTS_STREAM: str = "itemize:price-drops"
+    WATCH_EVENTS_MAX_LENGTH: int = 10000  # events kept for slow consumers
+    RESPONSE_CACHE_BACKEND: str = "memory"  # memory, redis or none
+    RESPONSE_CACHE_URL: str = "redis://localhost:6379/0"
+    RESPONSE_CACHE_TTL_SECONDS: int = 60 * 5
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    TRACING_EXPORTER: str = "none"  # none, console, memory or otlp
+    TRACING_SERVICE_NAME: str = "itemize"
 
 
 CONFIG = Config()
@@ -1,27 +1,220 @@
 import asyncio
+import logging
 
 import itemize.models as models
 
+from itemize import metrics
+
+from itemize import schemas
+
 from itemize.config import CONFIG
 
+from contextlib import asynccontextmanager, contextmanager
+
+from sqlalchemy import event, pool, text
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
     create_async_engine,
     async_sessionmaker,
-    async_scoped_session,
 )
 
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    TypeVar,
+)
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def database_url(uri: str) -> URL:
+    url = make_url(uri)
+    # hosted postgres providers hand out driverless URIs
+    if url.drivername in ("postgres", "postgresql"):
+        url = url.set(drivername="postgresql+asyncpg")
+    return url
+
+
+def create_engine(url: URL) -> AsyncEngine:
+    options: dict[str, Any] = {
+        "echo": CONFIG.ECHO_SQL,
+        "query_cache_size": CONFIG.DB_QUERY_CACHE_SIZE,
+    }
+    connect_args: dict[str, Any] = {}
+    is_sqlite = url.get_backend_name() == "sqlite"
+    is_memory = is_sqlite and url.database in (None, "", ":memory:")
+
+    if is_sqlite and not is_memory:
+        # keep connections (and their pragmas) around instead of the NullPool
+        # aiosqlite uses by default
+        options["poolclass"] = pool.AsyncAdaptedQueuePool
+    if url.get_driver_name() == "asyncpg":
+        connect_args["prepared_statement_cache_size"] = CONFIG.DB_STATEMENT_CACHE_SIZE
+    if not is_memory:
+        options |= {
+            "pool_size": CONFIG.DB_POOL_SIZE,
+            "max_overflow": CONFIG.DB_MAX_OVERFLOW,
+            "pool_timeout": CONFIG.DB_POOL_TIMEOUT_SECONDS,
+            "pool_recycle": CONFIG.DB_POOL_RECYCLE_SECONDS,
+            "pool_pre_ping": CONFIG.DB_POOL_PRE_PING,
+        }
+
+    engine = create_async_engine(url, connect_args=connect_args, **options)
+
+    if is_sqlite:
+        event.listen(engine.sync_engine, "connect", set_sqlite_pragmas)
+    metrics.instrument_engine(engine)
+
+    return engine
+
+
+def set_sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={CONFIG.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={CONFIG.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={CONFIG.SQLITE_BUSY_TIMEOUT_MS}")
+    # SQLite ignores foreign keys unless asked, per connection
+    if CONFIG.SQLITE_FOREIGN_KEYS:
+        cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+class StatementCounter:
+    def __init__(self) -> None:
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __call__(
+        self,
+        conn: Any,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        self.statements.append(statement)
+
 
 class DB:
-    engine = create_async_engine(CONFIG.DB_URI, echo=CONFIG.ECHO_SQL, future=True)
+    url = database_url(CONFIG.DB_URI)
+    engine = create_engine(url)
     session_maker = async_sessionmaker(
         bind=engine, autoflush=False, expire_on_commit=False
     )
-    async_session = async_scoped_session(session_maker, scopefunc=asyncio.current_task)
+
+    @staticmethod
+    @asynccontextmanager
+    async def session() -> AsyncIterator[AsyncSession]:
+        """
+        Open a session with its own connection checkout. Sessions must not be
+        shared between concurrently running tasks, open one per task instead.
+        """
+        async with DB.session_maker() as session:
+            yield session
+
+    @staticmethod
+    async def map_in_sessions(
+        func: Callable[[AsyncSession, T], Awaitable[R]],
+        items: Iterable[T],
+        *,
+        concurrency: int | None = None,
+    ) -> list[R]:
+        """
+        Run func over items concurrently, giving every call its own session.
+        Concurrency is bounded so fan out cannot exhaust the connection pool.
+        Results are returned in the order of items.
+        """
+        semaphore = asyncio.Semaphore(concurrency or CONFIG.DB_FANOUT_CONCURRENCY)
+
+        async def run(item: T) -> R:
+            async with semaphore, DB.session() as session:
+                return await func(session, item)
+
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(run(item)) for item in items]
+        return [task.result() for task in tasks]
 
     @staticmethod
     async def init_db() -> None:
+        try:
+            await DB._create_tables()
+        except DBAPIError:
+            # another process created the tables between our existence check
+            # and our CREATE TABLE, the retry finds them and does nothing
+            await DB._create_tables()
+        if DB.url.get_backend_name() == "sqlite" and CONFIG.SQLITE_FOREIGN_KEYS:
+            await DB._check_foreign_keys()
+
+    @staticmethod
+    async def _check_foreign_keys() -> None:
+        """
+        Warn about rows written before foreign keys were enforced that point
+        at rows which no longer exist, updating them would now fail.
+        """
+        async with DB.engine.connect() as conn:
+            rows = (await conn.execute(text("PRAGMA foreign_key_check"))).all()
+        dangling: dict[str, int] = {}
+        for table, _ in {(table, rowid) for table, rowid, *_ in rows}:
+            dangling[table] = dangling.get(table, 0) + 1
+        if dangling:
+            logger.warning(
+                "Rows with dangling foreign keys, delete or repair them or set "
+                "SQLITE_FOREIGN_KEYS=false",
+                extra={"rows": dangling},
+            )
+
+    @staticmethod
+    async def _create_tables() -> None:
         async with DB.engine.begin() as conn:
             if CONFIG.TABLE_DROP_ON_STARTUP:
                 await conn.run_sync(models.Base.metadata.drop_all)
             if CONFIG.TABLE_CREATE_ON_STARTUP:
                 await conn.run_sync(models.Base.metadata.create_all)
+
+    @staticmethod
+    @contextmanager
+    def count_statements() -> Iterator[StatementCounter]:
+        """
+        Record every SQL statement the engine executes inside the block.
+        """
+        counter = StatementCounter()
+        event.listen(DB.engine.sync_engine, "before_cursor_execute", counter)
+        try:
+            yield counter
+        finally:
+            event.remove(DB.engine.sync_engine, "before_cursor_execute", counter)
+
+    @staticmethod
+    def pool_status() -> schemas.DBPoolStatus:
+        pool_ = DB.engine.pool
+        status = schemas.DBPoolStatus(
+            pool_class=type(pool_).__name__,
+            dialect=DB.engine.dialect.name,
+            driver=DB.engine.dialect.driver,
+        )
+        if not isinstance(pool_, pool.QueuePool):
+            return status
+        return status.model_copy(
+            update={
+                "size": pool_.size(),
+                "checked_in": pool_.checkedin(),
+                "checked_out": pool_.checkedout(),
+                "overflow": pool_.overflow(),
+                "max_overflow": CONFIG.DB_MAX_OVERFLOW,
+            }
+        )
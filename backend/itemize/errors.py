@@ -26,6 +26,14 @@ class ItemizeLinkNotFoundError(ItemizeError):
     pass
 
 
+class ImportTooLargeError(ItemizeError):
+    pass
+
+
+class ItemizeQueryError(ItemizeError):
+    pass
+
+
 class MetadataError(BaseError):
     pass
 
@@ -72,6 +80,16 @@ async def handle_fastapi_exception(r: Request, e: BaseError) -> JSONResponse:
             return JSONResponse(
                 status_code=status.HTTP_404_NOT_FOUND, content={"detail": msg}
             )
+        case ImportTooLargeError(msg):
+            return JSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={"detail": msg},
+            )
+        case ItemizeQueryError(msg):
+            return JSONResponse(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                content={"detail": msg},
+            )
         case MetadataUnprocessableError(msg):
             return JSONResponse(
                 status_code=status.HTTP_400_BAD_REQUEST, content={"detail": msg}
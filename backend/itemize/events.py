@@ -0,0 +1,183 @@
+"""
+Price drop events.
+
+The price watcher publishes an event whenever a watched page gets cheaper.
+Events go to an append-only stream that any number of consumers read at their
+own pace, each keeping the id of the last event it has seen; a consumer
+that falls further behind than MAX_LENGTH events misses the oldest ones.
+
+The memory backend keeps the stream in the worker process, for development
+and tests; the redis backend uses a Redis stream so consumers can run
+anywhere and see the events of every worker.
+"""
+import abc
+import asyncio
+import itertools
+import logging
+
+from itemize import schemas
+
+from itemize.config import CONFIG
+
+from collections import deque
+
+from typing import Any, AsyncIterator, Protocol
+
+
+logger = logging.getLogger(__name__)
+
+StreamEntry = tuple[str, schemas.PriceDropEvent]
+
+
+class PriceDropQueue(abc.ABC):
+    @abc.abstractmethod
+    async def publish(self, events: list[schemas.PriceDropEvent]) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def read(
+        self, after: str | None = None, *, count: int = 100, block_seconds: float = 0
+    ) -> list[StreamEntry]:
+        """
+        Events after the given id, oldest first, or from the start of the
+        stream. Waits up to block_seconds for one if there are none yet.
+        """
+
+    async def close(self) -> None:
+        pass
+
+    async def consume(
+        self, after: str | None = None, *, block_seconds: float = 5
+    ) -> AsyncIterator[StreamEntry]:
+        while True:
+            for entry in await self.read(after, block_seconds=block_seconds):
+                after = entry[0]
+                yield entry
+
+
+class NullPriceDropQueue(PriceDropQueue):
+    async def publish(self, events: list[schemas.PriceDropEvent]) -> None:
+        pass
+
+    async def read(
+        self, after: str | None = None, *, count: int = 100, block_seconds: float = 0
+    ) -> list[StreamEntry]:
+        await asyncio.sleep(block_seconds)
+        return []
+
+
+class MemoryPriceDropQueue(PriceDropQueue):
+    def __init__(self, *, max_length: int) -> None:
+        self._entries: deque[tuple[int, schemas.PriceDropEvent]] = deque(
+            maxlen=max_length
+        )
+        self._ids = itertools.count(1)
+        self._published = asyncio.Condition()
+
+    async def publish(self, events: list[schemas.PriceDropEvent]) -> None:
+        if not events:
+            return
+        async with self._published:
+            self._entries.extend((next(self._ids), event) for event in events)
+            self._published.notify_all()
+
+    async def read(
+        self, after: str | None = None, *, count: int = 100, block_seconds: float = 0
+    ) -> list[StreamEntry]:
+        after_id = int(after or 0)
+
+        def entries() -> list[StreamEntry]:
+            # ids are increasing, so only the tail needs looking at
+            found = []
+            for id, event in reversed(self._entries):
+                if id <= after_id:
+                    break
+                found.append((str(id), event))
+            return found[::-1][:count]
+
+        found = entries()
+        if found or block_seconds <= 0:
+            return found
+        async with self._published:
+            try:
+                await asyncio.wait_for(self._published.wait(), block_seconds)
+            except asyncio.TimeoutError:
+                return []
+        return entries()
+
+
+class RedisClient(Protocol):
+    """
+    Subset of the redis.asyncio.Redis interface used by the queue.
+    """
+
+    async def xadd(
+        self, name: str, fields: Any, *, maxlen: int, approximate: bool
+    ) -> Any:
+        ...
+
+    async def xread(self, streams: Any, count: int, block: int | None) -> Any:
+        ...
+
+    async def aclose(self) -> Any:
+        ...
+
+
+class RedisPriceDropQueue(PriceDropQueue):
+    def __init__(self, client: RedisClient, *, stream: str, max_length: int) -> None:
+        self._client = client
+        self._stream = stream
+        self._max_length = max_length
+
+    async def publish(self, events: list[schemas.PriceDropEvent]) -> None:
+        for event in events:
+            await self._client.xadd(
+                self._stream,
+                {"event": event.model_dump_json()},
+                maxlen=self._max_length,
+                approximate=True,
+            )
+
+    async def read(
+        self, after: str | None = None, *, count: int = 100, block_seconds: float = 0
+    ) -> list[StreamEntry]:
+        response = await self._client.xread(
+            {self._stream: after or "0"},
+            count=count,
+            block=int(block_seconds * 1000) if block_seconds > 0 else None,
+        )
+        return [
+            (
+                id.decode() if isinstance(id, bytes) else id,
+                schemas.PriceDropEvent.model_validate_json(fields[b"event"]),
+            )
+            for _, entries in response or []
+            for id, fields in entries
+        ]
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def create_price_drop_queue() -> PriceDropQueue:
+    match CONFIG.WATCH_EVENTS_BACKEND:
+        case "memory":
+            if CONFIG.WEB_CONCURRENCY > 1:
+                logger.warning(
+                    "The memory price drop queue is per worker, consumers only "
+                    "see the drops found by their own worker; use redis to "
+                    "share it"
+                )
+            return MemoryPriceDropQueue(max_length=CONFIG.WATCH_EVENTS_MAX_LENGTH)
+        case "redis":
+            import redis.asyncio
+
+            return RedisPriceDropQueue(
+                redis.asyncio.Redis.from_url(CONFIG.WATCH_EVENTS_URL),
+                stream=CONFIG.WATCH_EVENTS_STREAM,
+                max_length=CONFIG.WATCH_EVENTS_MAX_LENGTH,
+            )
+        case "none":
+            return NullPriceDropQueue()
+        case backend:
+            raise ValueError(f"Unknown price drop queue backend: {backend}")
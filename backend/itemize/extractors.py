@@ -0,0 +1,160 @@
+"""
+Per-domain metadata extractors.
+
+Some retailers publish little or misleading generic metadata, so pages from
+their hosts are first run through an extractor with hand written XPath or CSS
+rules; whatever it finds takes precedence and the generic formats fill in the
+rest. Rules are compiled once per process on first use.
+
+Extractors are looked up by host, then by each parent domain, so one
+registered for "amazon.com" also covers "www.amazon.com". Besides the built
+in ones below, modules listed in PARSER_PLUGINS are imported and their
+EXTRACTORS registered.
+
+An extractor that only reads <head> should set head_only, then only the head
+of its pages is downloaded.
+"""
+import functools
+import importlib
+import logging
+import re
+
+from itemize.config import CONFIG
+
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from typing import Any, Callable
+
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("title", "site_name", "description", "image_url", "price", "currency")
+
+# parsel style pseudo elements, CSS itself cannot select text or attributes
+_CSS_PSEUDO = re.compile(r"::(?:text|attr\(([\w:-]+)\))$")
+
+
+def css_to_xpath(selector: str) -> str:
+    from cssselect import GenericTranslator
+
+    match = _CSS_PSEUDO.search(selector)
+    xpath: str = GenericTranslator().css_to_xpath(
+        selector[: match.start()] if match else selector
+    )
+    if match is None:
+        return xpath
+    if match.group(1) is None:
+        return f"{xpath}/text()"
+    return f"{xpath}/@{match.group(1)}"
+
+
+def first_value(results: Any) -> str | None:
+    if not isinstance(results, list):
+        results = [results]
+    for result in results:
+        if hasattr(result, "text_content"):
+            result = result.text_content()
+        value = " ".join(str(result).split())
+        if value:
+            return value
+    return None
+
+
+@dataclass
+class DomainExtractor:
+    name: str
+    hosts: tuple[str, ...]
+    # field -> expressions, tried in order until one yields a non empty value
+    xpath: dict[str, list[str]] = field(default_factory=dict)
+    css: dict[str, list[str]] = field(default_factory=dict)
+    constants: dict[str, str] = field(default_factory=dict)
+    head_only: bool = False
+
+    @functools.cached_property
+    def _rules(self) -> dict[str, list[Callable[[Any], Any]]]:
+        from lxml import etree
+
+        rules: dict[str, list[Callable[[Any], Any]]] = {}
+        for field_, expressions in self.xpath.items():
+            rules.setdefault(field_, []).extend(map(etree.XPath, expressions))
+        for field_, selectors in self.css.items():
+            rules.setdefault(field_, []).extend(
+                etree.XPath(css_to_xpath(selector)) for selector in selectors
+            )
+        return rules
+
+    def extract(self, tree: Any) -> dict[str, str]:
+        values = dict(self.constants)
+        for field_, rules in self._rules.items():
+            for rule in rules:
+                value = first_value(rule(tree))
+                if value is not None:
+                    values[field_] = value
+                    break
+        return values
+
+
+class ExtractorRegistry:
+    def __init__(self) -> None:
+        self._by_host: dict[str, DomainExtractor] = {}
+
+    def register(self, extractor: DomainExtractor) -> None:
+        unknown = set(extractor.xpath) | set(extractor.css) | set(extractor.constants)
+        unknown -= set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields in {extractor.name}: {sorted(unknown)}")
+        for host in extractor.hosts:
+            self._by_host[host.lower()] = extractor
+
+    def for_url(self, url: str) -> DomainExtractor | None:
+        labels = (urlsplit(url).hostname or "").split(".")
+        # one dict lookup per label, www.shop.example.com -> ... -> example.com
+        for i in range(len(labels) - 1):
+            extractor = self._by_host.get(".".join(labels[i:]))
+            if extractor is not None:
+                return extractor
+        return None
+
+
+AMAZON = DomainExtractor(
+    name="amazon",
+    hosts=(
+        "amazon.com",
+        "amazon.ca",
+        "amazon.co.uk",
+        "amazon.de",
+        "amazon.fr",
+        "amazon.it",
+        "amazon.es",
+        "amazon.com.au",
+    ),
+    css={
+        "title": ["#productTitle::text"],
+        "image_url": [
+            "#landingImage::attr(data-old-hires)",
+            "#landingImage::attr(src)",
+            "#imgBlkFront::attr(src)",
+        ],
+        "price": [
+            "#corePrice_feature_div .a-price .a-offscreen::text",
+            "#corePriceDisplay_desktop_feature_div .a-price .a-offscreen::text",
+        ],
+        "description": ["#productDescription"],
+    },
+    constants={"site_name": "Amazon"},
+)
+
+
+def create_registry() -> ExtractorRegistry:
+    registry = ExtractorRegistry()
+    registry.register(AMAZON)
+    for module_name in CONFIG.PARSER_PLUGINS:
+        module = importlib.import_module(module_name)
+        for extractor in getattr(module, "EXTRACTORS", []):
+            registry.register(extractor)
+        logger.info("Loaded parser plugin", extra={"plugin": module_name})
+    return registry
+
+
+REGISTRY = create_registry()
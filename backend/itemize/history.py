@@ -0,0 +1,265 @@
+"""
+Price history.
+
+Every stored price is also appended to the page's history, run length
+encoded: an observation equal to the page's latest run only extends that
+run's last_seen_at and sample count, so a price that never changes costs one
+row however often the page is refreshed. Runs older than
+PRICE_HISTORY_RAW_DAYS are downsampled to one row per page, currency and day,
+keeping the closing, lowest and highest price.
+
+Observations are buffered per worker and written in batches, one query to
+find the latest runs and one bulk INSERT and UPDATE each, either every
+PRICE_HISTORY_FLUSH_SECONDS or as soon as PRICE_HISTORY_BATCH_SIZE are
+pending.
+"""
+import asyncio
+import itertools
+import logging
+
+from itemize import metrics
+from itemize import models
+
+from itemize.config import CONFIG
+from itemize.db import DB
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Observation:
+    page_metadata_id: int
+    price_minor: int
+    currency_code: str | None
+    observed_at: datetime = field(default_factory=datetime.utcnow)
+
+
+async def write_observations(
+    session: AsyncSession, observations: list[Observation]
+) -> None:
+    latest_ids = (
+        select(func.max(models.PriceObservation.id))
+        .where(
+            models.PriceObservation.page_metadata_id.in_(
+                {observation.page_metadata_id for observation in observations}
+            )
+        )
+        .group_by(models.PriceObservation.page_metadata_id)
+    )
+    # the latest run of every page as the parameters of its INSERT or UPDATE
+    runs: dict[int, dict[str, Any]] = {
+        row.page_metadata_id: row._asdict()
+        for row in await session.execute(
+            select(
+                models.PriceObservation.id,
+                models.PriceObservation.page_metadata_id,
+                models.PriceObservation.currency_code,
+                models.PriceObservation.price_minor,
+                models.PriceObservation.last_seen_at,
+                models.PriceObservation.samples,
+            ).where(models.PriceObservation.id.in_(latest_ids))
+        )
+    }
+
+    new_runs: list[dict[str, Any]] = []
+    extended_runs: dict[int, dict[str, Any]] = {}
+    for observation in sorted(observations, key=lambda o: o.observed_at):
+        run = runs.get(observation.page_metadata_id)
+        if run is not None and (run["price_minor"], run["currency_code"]) == (
+            observation.price_minor,
+            observation.currency_code,
+        ):
+            run["last_seen_at"] = max(run["last_seen_at"], observation.observed_at)
+            run["samples"] += 1
+            if "id" in run:
+                extended_runs[run["id"]] = run
+            continue
+        run = {
+            "page_metadata_id": observation.page_metadata_id,
+            "currency_code": observation.currency_code,
+            "price_minor": observation.price_minor,
+            "low_minor": observation.price_minor,
+            "high_minor": observation.price_minor,
+            "first_seen_at": observation.observed_at,
+            "last_seen_at": observation.observed_at,
+            "samples": 1,
+        }
+        new_runs.append(run)
+        runs[observation.page_metadata_id] = run
+
+    # one executemany INSERT and one executemany UPDATE by primary key
+    if new_runs:
+        await session.execute(insert(models.PriceObservation), new_runs)
+    if extended_runs:
+        await session.execute(
+            update(models.PriceObservation),
+            [
+                {
+                    "id": id,
+                    "last_seen_at": run["last_seen_at"],
+                    "samples": run["samples"],
+                }
+                for id, run in extended_runs.items()
+            ],
+        )
+    await session.commit()
+    metrics.record_price_observations("new", len(new_runs))
+    metrics.record_price_observations("extended", len(observations) - len(new_runs))
+
+
+class PriceHistoryWriter:
+    def __init__(
+        self, *, flush_seconds: float, batch_size: int, max_pending: int
+    ) -> None:
+        self._flush_seconds = flush_seconds
+        self._batch_size = batch_size
+        self._max_pending = max_pending
+        self._pending: list[Observation] = []
+        self._wake = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task[None] | None = None
+
+    def record(
+        self,
+        page_metadata_id: int,
+        price_minor: int | None,
+        currency_code: str | None,
+        observed_at: datetime | None = None,
+    ) -> None:
+        if price_minor is None:
+            return
+        if len(self._pending) >= self._max_pending:
+            metrics.record_price_observations("dropped")
+            return
+        self._pending.append(
+            Observation(
+                page_metadata_id=page_metadata_id,
+                price_minor=price_minor,
+                currency_code=currency_code,
+                observed_at=observed_at or datetime.utcnow(),
+            )
+        )
+        if len(self._pending) >= self._batch_size:
+            self._wake.set()
+
+    async def flush(self) -> int:
+        async with self._lock:
+            pending, self._pending = self._pending, []
+            for start in range(0, len(pending), self._batch_size):
+                batch = pending[start : start + self._batch_size]
+                try:
+                    async with DB.session() as session:
+                        await write_observations(session, batch)
+                except Exception:
+                    # keep what was not written for the next flush, up to the
+                    # pending limit, newest observations first
+                    unwritten = pending[start:] + self._pending
+                    self._pending = unwritten[-self._max_pending :]
+                    metrics.record_price_observations(
+                        "dropped", len(unwritten) - len(self._pending)
+                    )
+                    raise
+            return len(pending)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Writing price history failed")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Writing price history failed on shutdown")
+
+
+def create_writer() -> PriceHistoryWriter:
+    return PriceHistoryWriter(
+        flush_seconds=CONFIG.PRICE_HISTORY_FLUSH_SECONDS,
+        batch_size=CONFIG.PRICE_HISTORY_BATCH_SIZE,
+        max_pending=CONFIG.PRICE_HISTORY_MAX_PENDING,
+    )
+
+
+async def downsample(
+    session: AsyncSession, *, batch_size: int, before: datetime | None = None
+) -> int:
+    """
+    Merge the runs of each page, currency and day that ended before the
+    cutoff into one, returning how many rows were merged away.
+    """
+    before = before or datetime.utcnow() - timedelta(days=CONFIG.PRICE_HISTORY_RAW_DAYS)
+    bucket = (
+        models.PriceObservation.page_metadata_id,
+        func.coalesce(models.PriceObservation.currency_code, ""),
+        func.date(models.PriceObservation.first_seen_at),
+    )
+    buckets = (
+        select(*bucket)
+        .where(models.PriceObservation.last_seen_at < before)
+        .group_by(*bucket)
+        .having(func.count() > 1)
+        .limit(batch_size)
+    )
+    merged = 0
+    while bucket_keys := list(await session.execute(buckets)):
+        runs = await session.scalars(
+            select(models.PriceObservation)
+            .where(
+                tuple_(*bucket).in_(bucket_keys),
+                models.PriceObservation.last_seen_at < before,
+            )
+            .order_by(*bucket, models.PriceObservation.first_seen_at)
+        )
+        removed = []
+        for _, group in itertools.groupby(
+            runs,
+            key=lambda run: (
+                run.page_metadata_id,
+                run.currency_code,
+                run.first_seen_at.date(),
+            ),
+        ):
+            first, *rest = group
+            for run in rest:
+                first.price_minor = run.price_minor
+                first.low_minor = min(first.low_minor, run.low_minor)
+                first.high_minor = max(first.high_minor, run.high_minor)
+                first.last_seen_at = max(first.last_seen_at, run.last_seen_at)
+                first.samples += run.samples
+                removed.append(run.id)
+        await session.execute(
+            delete(models.PriceObservation).where(
+                models.PriceObservation.id.in_(removed)
+            )
+        )
+        await session.commit()
+        merged += len(removed)
+    return merged
@@ -0,0 +1,155 @@
+"""
+Request identities for outbound fetches.
+
+User agents are loaded once per worker into a pool of header profiles. Each
+profile keeps the User-Agent, Accept and Accept-Language headers consistent
+with one browser. Requests rotate through the pool per domain, so consecutive
+fetches from one retailer do not all look the same. If fake_useragent or its
+dataset is unavailable the pool is built from the user agents bundled here.
+"""
+import itertools
+import logging
+import random
+
+from itemize.config import CONFIG
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+from typing import Iterator, Literal
+
+
+logger = logging.getLogger(__name__)
+
+FetchKind = Literal["page", "image"]
+
+# per browser family: page Accept, image Accept
+ACCEPT_HEADERS = {
+    "chrome": (
+        "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,"
+        "image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+        "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8",
+    ),
+    "edge": (
+        "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,"
+        "image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+        "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8",
+    ),
+    "firefox": (
+        "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,"
+        "image/webp,*/*;q=0.8",
+        "image/avif,image/webp,*/*",
+    ),
+    "safari": (
+        "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "image/webp,image/avif,image/png,image/svg+xml,image/*;q=0.8,*/*;q=0.5",
+    ),
+}
+ACCEPT_LANGUAGES = ["en-US,en;q=0.9", "en-GB,en;q=0.9", "en-US,en;q=0.5", "en"]
+
+FALLBACK_USER_AGENTS = {
+    "chrome": [
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36",
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36",
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/116.0.0.0 Safari/537.36",
+    ],
+    "edge": [
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36 Edg/117.0.2045.43",
+    ],
+    "firefox": [
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:118.0) Gecko/20100101 "
+        "Firefox/118.0",
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:118.0) Gecko/20100101 "
+        "Firefox/118.0",
+        "Mozilla/5.0 (X11; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/117.0",
+    ],
+    "safari": [
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 "
+        "(KHTML, like Gecko) Version/16.6 Safari/605.1.15",
+    ],
+}
+
+
+@dataclass(frozen=True)
+class HeaderProfile:
+    browser: str
+    user_agent: str
+    accept_language: str
+
+    def headers(self, kind: FetchKind = "page") -> dict[str, str]:
+        page_accept, image_accept = ACCEPT_HEADERS[self.browser]
+        return {
+            "User-Agent": self.user_agent,
+            "Accept": page_accept if kind == "page" else image_accept,
+            "Accept-Language": self.accept_language,
+        }
+
+
+def load_user_agents(per_browser: int) -> dict[str, list[str]]:
+    try:
+        import fake_useragent
+
+        user_agent = fake_useragent.UserAgent(browsers=list(ACCEPT_HEADERS))
+        loaded = {
+            browser: sorted({getattr(user_agent, browser) for _ in range(per_browser)})
+            for browser in ACCEPT_HEADERS
+        }
+    except Exception:
+        logger.warning("Could not load user agents, using the bundled set")
+        return FALLBACK_USER_AGENTS
+    return loaded
+
+
+def build_profiles(user_agents: dict[str, list[str]]) -> list[HeaderProfile]:
+    profiles = [
+        HeaderProfile(
+            browser=browser,
+            user_agent=user_agent,
+            accept_language=random.choice(ACCEPT_LANGUAGES),
+        )
+        for browser, agents in user_agents.items()
+        for user_agent in agents
+    ]
+    random.shuffle(profiles)
+    return profiles
+
+
+class RequestIdentity:
+    """
+    Rotates header profiles per domain. Every domain starts at a random point
+    of the shared pool and then walks through it, one profile per request.
+    """
+
+    def __init__(self, profiles: list[HeaderProfile], *, max_domains: int) -> None:
+        if not profiles:
+            raise ValueError("At least one header profile is required")
+        self.profiles = profiles
+        self._max_domains = max_domains
+        self._domains: OrderedDict[str, Iterator[HeaderProfile]] = OrderedDict()
+
+    def profile(self, url: str) -> HeaderProfile:
+        domain = urlsplit(url).hostname or ""
+        rotation = self._domains.get(domain)
+        if rotation is None:
+            start = random.randrange(len(self.profiles))
+            rotation = itertools.cycle(self.profiles[start:] + self.profiles[:start])
+            self._domains[domain] = rotation
+            while len(self._domains) > self._max_domains:
+                self._domains.popitem(last=False)
+        self._domains.move_to_end(domain)
+        return next(rotation)
+
+    def headers(self, url: str, kind: FetchKind = "page") -> dict[str, str]:
+        return self.profile(url).headers(kind)
+
+
+def create_identity() -> RequestIdentity:
+    return RequestIdentity(
+        build_profiles(load_user_agents(CONFIG.USER_AGENTS_PER_BROWSER)),
+        max_domains=CONFIG.USER_AGENT_MAX_DOMAINS,
+    )
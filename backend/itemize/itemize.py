@@ -1,48 +1,65 @@
+import asyncio
+import logging
+
+from itemize import cache
 from itemize import util
 from itemize import schemas
 from itemize import models
 from itemize import metadata
+from itemize import metrics
+from itemize import prices
+from itemize import queries
 
+from itemize.config import CONFIG
+from itemize.resources import Resources
+from itemize.db import DB
 from itemize.errors import (
+    ImportTooLargeError,
     ItemizeExistsError,
     ItemizeNotFoundError,
     ItemizeLinkNotFoundError,
+    ItemizeQueryError,
     MetadataUnprocessableError,
     UserNotFoundError,
 )
 
-from sqlalchemy import func, select
-from sqlalchemy.orm import selectinload
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import (
+    ColumnElement,
+    asc,
+    case,
+    delete,
+    desc,
+    func,
+    insert,
+    or_,
+    select,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from typing import Any, AsyncIterator
+
+
+logger = logging.getLogger(__name__)
+
+ImportEvent = schemas.ImportLinkEvent | schemas.ImportLinksSummary
+
 
 async def create_itemize(
     session: AsyncSession, name: str, description: str | None, username: str
 ) -> schemas.Itemize:
     slug = util.slugify(name)
-    existing_slug = (
-        await session.scalar(
-            select(func.count())
-            .select_from(models.Itemize)
-            .where(
-                models.Itemize.slug == slug,
-            )
-        )
-        or 0
-    )
-    if existing_slug > 0:
-        raise ItemizeExistsError("Itemize with this name already exists!")
-
     user_id = await session.scalar(
-        select(models.User.id)
-        .select_from(select(models.User).subquery())
-        .where(
-            models.User.username == username,
-        )
+        select(models.User.id).where(models.User.username == username)
     )
     if user_id is None:
         raise UserNotFoundError("User not found!")
 
+    # slugs are unique per user through the (user_id, slug) index
     itemize = models.Itemize(
         name=name,
         slug=slug,
@@ -50,7 +67,11 @@ async def create_itemize(
         user_id=user_id,
     )
     session.add(itemize)
-    await session.commit()
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise ItemizeExistsError("Itemize with this name already exists!")
     await session.refresh(itemize, ["user"])
 
     return await itemize.to_schema()
@@ -58,7 +79,7 @@ async def create_itemize(
 
 async def list_itemizes(
     session: AsyncSession,
-    user: schemas.User | None,
+    user: schemas.AuthUser | None,
     username: str,
     *,
     query: str | None = None,
@@ -83,47 +104,41 @@ async def list_itemizes(
         stmt = stmt.where(models.Itemize.public == True)  # noqa: E712
 
     itemizes = await session.scalars(stmt)
-    return [
-        await itemize.to_schema()
-        for itemize in itemizes
-        if query is None
-        or (
-            query in itemize.name.lower()
-            or query in (itemize.description or "").lower()
+    with metrics.time_stage("to_schema"):
+        return [
+            await itemize.to_schema()
+            for itemize in itemizes
+            if query is None
             or (
-                itemize.user is not None
-                and query in (itemize.user.username or "").lower()
+                query in itemize.name.lower()
+                or query in (itemize.description or "").lower()
+                or (
+                    itemize.user is not None
+                    and query in (itemize.user.username or "").lower()
+                )
             )
-        )
-    ]
+        ]
 
 
 async def get_itemize(
     session: AsyncSession,
-    user: schemas.User | None,
+    user: schemas.AuthUser | None,
     username: str,
     slug: str,
     *,
     query: str | None = None,
+    sort: schemas.LinkSort = "created_at",
+    order: schemas.SortOrder = "asc",
+    min_price: Decimal | None = None,
+    max_price: Decimal | None = None,
+    currency: str | None = None,
 ) -> schemas.Itemize:
+    # amounts only compare within one currency, its exponent gives the units
+    if currency is None and (min_price is not None or max_price is not None):
+        raise ItemizeQueryError("Price bounds need a currency!")
     itemize_error = ItemizeNotFoundError("Itemize not found!")
-    itemize = await session.scalar(
-        select(models.Itemize)
-        .join(models.User)
-        .where(
-            models.User.username == username,
-            models.Itemize.slug == slug,
-        )
-        .options(
-            selectinload(models.Itemize.links),
-            selectinload(models.Itemize.links)
-            .selectinload(models.Link.page_metadata)
-            .selectinload(models.PageMetadata.image),
-            selectinload(models.Itemize.user),
-            selectinload(models.Itemize.links)
-            .selectinload(models.Link.page_metadata_override)
-            .selectinload(models.PageMetadataOverride.image),
-        )
+    itemize: models.Itemize | None = await session.scalar(
+        queries.itemize_with_user_by_owner(username, slug)
     )
     if itemize is None:
         raise itemize_error
@@ -131,7 +146,91 @@ async def get_itemize(
     if not itemize.public and (user is None or user.username != username):
         raise itemize_error
 
-    return await itemize.to_schema(link_query=query)
+    # amount and currency come from the same row: the override's when it sets
+    # a price, otherwise the page's, so a currency-only override cannot pair
+    # its currency with the page's amount
+    has_override_price = models.PageMetadataOverride.price_minor.is_not(None)
+    price_minor = case(
+        (has_override_price, models.PageMetadataOverride.price_minor),
+        else_=models.PageMetadata.price_minor,
+    )
+    currency_code = case(
+        (has_override_price, models.PageMetadataOverride.currency_code),
+        else_=models.PageMetadata.currency_code,
+    )
+    conditions: list[ColumnElement[bool]] = [models.Link.itemize_id == itemize.id]
+    if query is not None:
+        conditions.append(
+            or_(
+                *(
+                    func.lower(column).contains(query.lower(), autoescape=True)
+                    for column in (
+                        models.PageMetadata.title,
+                        models.PageMetadata.description,
+                        models.PageMetadata.site_name,
+                        models.PageMetadata.url,
+                    )
+                )
+            )
+        )
+    if currency is not None:
+        currency = currency.upper()
+        conditions.append(currency_code == currency)
+    if min_price is not None:
+        conditions.append(price_minor >= prices.to_minor(min_price, currency))
+    if max_price is not None:
+        conditions.append(price_minor <= prices.to_minor(max_price, currency))
+
+    direction = asc if order == "asc" else desc
+    order_by = [direction(models.Link.created_at), models.Link.id]
+    if sort == "price":
+        order_by.insert(0, direction(price_minor).nulls_last())
+        if currency is None:
+            # group by currency, minor units of different ones do not compare
+            order_by.insert(0, currency_code.nulls_last())
+
+    links_stmt = (
+        select(models.Link)
+        .join(models.Link.page_metadata)
+        .outerjoin(models.Link.page_metadata_override)
+        .where(*conditions)
+        .order_by(*order_by)
+        .options(
+            contains_eager(models.Link.page_metadata).selectinload(
+                models.PageMetadata.image
+            ),
+            contains_eager(models.Link.page_metadata_override).selectinload(
+                models.PageMetadataOverride.image
+            ),
+        )
+    )
+    totals_stmt = (
+        select(currency_code, func.sum(price_minor), func.count())
+        .select_from(models.Link)
+        .join(models.Link.page_metadata)
+        .outerjoin(models.Link.page_metadata_override)
+        .where(*conditions, price_minor.is_not(None))
+        .group_by(currency_code)
+        .order_by(currency_code)
+    )
+    links = (await session.scalars(links_stmt)).all()
+    totals = [
+        schemas.PriceTotal(
+            currency_code=code,
+            amount_minor=amount_minor,
+            amount=prices.from_minor(amount_minor, code),
+            links=count,
+        )
+        for code, amount_minor, count in await session.execute(totals_stmt)
+    ]
+
+    with metrics.time_stage("to_schema"):
+        return (await itemize.to_schema()).model_copy(
+            update={
+                "links": [await link.to_schema() for link in links],
+                "totals": totals,
+            }
+        )
 
 
 async def update_itemize(
@@ -142,57 +241,73 @@ async def update_itemize(
     name: str | None = None,
     description: str | None = None,
     public: bool | None = None,
+    resources: Resources,
 ) -> schemas.Itemize:
-    itemize = await session.scalar(
-        select(models.Itemize)
-        .join(models.User)
-        .where(
-            models.User.username == username,
-            models.Itemize.slug == slug,
-        )
+    itemize: models.Itemize | None = await session.scalar(
+        queries.itemize_by_owner(username, slug)
     )
     if itemize is None:
         raise ItemizeNotFoundError("Itemize not found!")
 
     if name is not None:
-        new_slug = util.slugify(name)
-        existing_slug = (
-            await session.scalar(
-                select(func.count())
-                .select_from(models.Itemize)
-                .where(
-                    models.Itemize.slug == new_slug,
-                )
-            )
-            or 0
-        )
-        if existing_slug > 0:
-            raise ItemizeExistsError("Itemize with this name already exists!")
         itemize.name = name
-        itemize.slug = new_slug
+        itemize.slug = util.slugify(name)
     if description is not None:
         itemize.description = description
     if public is not None:
         itemize.public = public
-    await session.commit()
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise ItemizeExistsError("Itemize with this name already exists!")
     await session.refresh(itemize)
+    await cache.invalidate_itemize(
+        resources.response_cache, username, slug, itemize.slug
+    )
 
     return await itemize.to_schema()
 
 
+async def delete_itemize(
+    session: AsyncSession, username: str, slug: str, *, resources: Resources
+) -> None:
+    itemize_id: int | None = await session.scalar(
+        queries.itemize_id_by_owner(username, slug)
+    )
+    if itemize_id is None:
+        raise ItemizeNotFoundError("Itemize not found!")
+
+    # set based cascade: links first since they reference their overrides,
+    # shared page metadata and images are left to the garbage collector
+    override_ids = [
+        override_id
+        for override_id in await session.scalars(
+            delete(models.Link)
+            .where(models.Link.itemize_id == itemize_id)
+            .returning(models.Link.page_metadata_override_id)
+        )
+        if override_id is not None
+    ]
+    if override_ids:
+        await session.execute(
+            delete(models.PageMetadataOverride).where(
+                models.PageMetadataOverride.id.in_(override_ids)
+            )
+        )
+    await session.execute(delete(models.Itemize).where(models.Itemize.id == itemize_id))
+    await session.commit()
+    await cache.invalidate_itemize(resources.response_cache, username, slug)
+
+
 async def create_link(
-    session: AsyncSession, username: str, slug: str, url: str
+    session: AsyncSession, username: str, slug: str, url: str, *, resources: Resources
 ) -> schemas.Link:
-    metadata_ = await metadata.get_metadata(session, url)
+    metadata_ = await metadata.get_metadata(session, url, resources=resources)
     if metadata_ is None:
         raise MetadataUnprocessableError("Could not get metadata for url!")
-    itemize = await session.scalar(
-        select(models.Itemize)
-        .join(models.User)
-        .where(
-            models.User.username == username,
-            models.Itemize.slug == slug,
-        )
+    itemize: models.Itemize | None = await session.scalar(
+        queries.itemize_by_owner(username, slug)
     )
     if itemize is None:
         raise ItemizeNotFoundError("Itemize not found!")
@@ -200,6 +315,7 @@ async def create_link(
     link = models.Link(url=url, page_metadata_id=metadata_.id, itemize_id=itemize.id)
     session.add(link)
     await session.commit()
+    await cache.invalidate_itemize(resources.response_cache, username, slug)
 
     return await link.to_schema()
 
@@ -216,34 +332,17 @@ async def update_link_metadata(
     site_name: str | None = None,
     price: str | None = None,
     currency: str | None = None,
+    resources: Resources,
 ) -> schemas.Link:
-    link = await session.scalar(
-        select(models.Link)
-        .join(models.Itemize)
-        .join(models.User)
-        .where(
-            models.User.username == username,
-            models.Itemize.slug == slug,
-            models.Link.id == link_id,
-        )
-        .options(
-            selectinload(models.Link.page_metadata_override),
-        )
+    link: models.Link | None = await session.scalar(
+        queries.link_with_metadata_by_owner(username, slug, link_id)
     )
     if link is None:
         raise ItemizeLinkNotFoundError("Link not found!")
 
-    if link.page_metadata_override_id is None:
-        link.page_metadata_override = models.PageMetadataOverride()
-        session.add(link.page_metadata_override)
-        await session.commit()
-        await session.refresh(link.page_metadata_override)
-        link.page_metadata_override_id = link.page_metadata_override.id
-        await session.commit()
-        await session.refresh(link, ["page_metadata_override"])
-
+    # the override and the link's foreign key go out in the same flush
     if link.page_metadata_override is None:
-        raise MetadataUnprocessableError("Could not get or create metadata override!")
+        link.page_metadata_override = models.PageMetadataOverride()
 
     if image_url is not None:
         link.page_metadata_override.image_url = image_url
@@ -257,26 +356,226 @@ async def update_link_metadata(
         link.page_metadata_override.price = price
     if currency is not None:
         link.page_metadata_override.currency = currency
+    if price is not None or currency is not None:
+        override = link.page_metadata_override
+        (override.price_minor, override.currency_code) = prices.normalize(
+            override.price, override.currency or link.page_metadata.currency
+        )
     await session.commit()
-    await session.refresh(link, ["page_metadata_override", "page_metadata"])
+    await cache.invalidate_itemize(resources.response_cache, username, slug)
 
     return await link.to_schema()
 
 
+async def get_link_prices(
+    session: AsyncSession,
+    user: schemas.AuthUser | None,
+    username: str,
+    slug: str,
+    link_id: int,
+    *,
+    since: datetime | None = None,
+) -> schemas.PriceSeries:
+    link_error = ItemizeLinkNotFoundError("Link not found!")
+    row = (
+        await session.execute(queries.link_page_by_owner(username, slug, link_id))
+    ).first()
+    if row is None:
+        raise link_error
+    page_metadata_id, public = row
+    if not public and (user is None or user.username != username):
+        raise link_error
+
+    stmt = (
+        select(
+            models.PriceObservation.first_seen_at,
+            models.PriceObservation.last_seen_at,
+            models.PriceObservation.currency_code,
+            models.PriceObservation.price_minor,
+            models.PriceObservation.low_minor,
+            models.PriceObservation.high_minor,
+        )
+        .where(models.PriceObservation.page_metadata_id == page_metadata_id)
+        .order_by(models.PriceObservation.first_seen_at)
+    )
+    if since is not None:
+        stmt = stmt.where(models.PriceObservation.last_seen_at >= since)
+    runs = (await session.execute(stmt)).all()
+    return schemas.PriceSeries(
+        link_id=link_id,
+        first_seen_at=[run.first_seen_at for run in runs],
+        last_seen_at=[run.last_seen_at for run in runs],
+        currency_code=[run.currency_code for run in runs],
+        price_minor=[run.price_minor for run in runs],
+        low_minor=[run.low_minor for run in runs],
+        high_minor=[run.high_minor for run in runs],
+    )
+
+
 async def delete_link(
-    session: AsyncSession, username: str, slug: str, link_id: int
+    session: AsyncSession,
+    username: str,
+    slug: str,
+    link_id: int,
+    *,
+    resources: Resources,
 ) -> None:
-    link = await session.scalar(
-        select(models.Link)
-        .join(models.Itemize)
-        .join(models.User)
-        .where(
-            models.User.username == username,
-            models.Itemize.slug == slug,
-            models.Link.id == link_id,
-        )
+    link: models.Link | None = await session.scalar(
+        queries.link_by_owner(username, slug, link_id)
     )
     if link is None:
         raise ItemizeLinkNotFoundError("Link not found!")
+    override_id = link.page_metadata_override_id
     await session.delete(link)
+    await session.flush()
+    if override_id is not None:
+        await session.execute(
+            delete(models.PageMetadataOverride).where(
+                models.PageMetadataOverride.id == override_id
+            )
+        )
     await session.commit()
+    await cache.invalidate_itemize(resources.response_cache, username, slug)
+
+
+async def import_links(
+    session: AsyncSession,
+    username: str,
+    slug: str,
+    urls: list[str],
+    *,
+    resources: Resources,
+) -> AsyncIterator[ImportEvent]:
+    """
+    Validate a bulk import and return the stream of its progress events.
+
+    Validation happens up front on the request session so errors surface as
+    normal responses; the returned stream does its own database work.
+    """
+    urls = list(dict.fromkeys(url.strip() for url in urls if url.strip()))
+    if len(urls) > CONFIG.IMPORT_MAX_URLS:
+        raise ImportTooLargeError(
+            f"Cannot import more than {CONFIG.IMPORT_MAX_URLS} links at once!"
+        )
+
+    itemize_id: int | None = await session.scalar(
+        queries.itemize_id_by_owner(username, slug)
+    )
+    if itemize_id is None:
+        raise ItemizeNotFoundError("Itemize not found!")
+
+    existing = set(
+        await session.scalars(select(models.Link.url).where(models.Link.url.in_(urls)))
+    )
+    # end the read transaction, returning its connection to the pool; the
+    # request session stays open until the whole stream has been sent
+    await session.commit()
+    return _import_links(username, slug, itemize_id, urls, existing, resources)
+
+
+async def _import_links(
+    username: str,
+    slug: str,
+    itemize_id: int,
+    urls: list[str],
+    existing: set[str],
+    resources: Resources,
+) -> AsyncIterator[ImportEvent]:
+    counts = {"imported": 0, "exists": 0, "failed": 0}
+    semaphore = asyncio.Semaphore(CONFIG.IMPORT_CONCURRENCY)
+
+    async def fetch(url: str) -> tuple[str, schemas.PageMetadata | None, str | None]:
+        async with semaphore:
+            try:
+                async with DB.session() as session:
+                    metadata_ = await metadata.get_metadata(
+                        session, url, resources=resources
+                    )
+                    return url, metadata_, None
+            except Exception as e:
+                logger.warning(
+                    "Failed to import link", extra={"url": url, "error": repr(e)}
+                )
+                return url, None, str(e) or type(e).__name__
+
+    for url in existing:
+        counts["exists"] += 1
+        yield schemas.ImportLinkEvent(
+            url=url, status="exists", detail="Link already exists!"
+        )
+
+    tasks = [asyncio.create_task(fetch(url)) for url in urls if url not in existing]
+    rows: list[dict[str, Any]] = []
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            url, metadata_, error = await next_result
+            if metadata_ is None:
+                counts["failed"] += 1
+                yield schemas.ImportLinkEvent(
+                    url=url,
+                    status="failed",
+                    detail=error or "Could not get metadata for url!",
+                )
+                continue
+
+            rows.append(
+                {"url": url, "itemize_id": itemize_id, "page_metadata_id": metadata_.id}
+            )
+            if len(rows) >= CONFIG.IMPORT_BATCH_SIZE:
+                for event in await _insert_links(rows):
+                    counts[event.status] += 1
+                    yield event
+                await cache.invalidate_itemize(resources.response_cache, username, slug)
+                rows = []
+
+        if rows:
+            for event in await _insert_links(rows):
+                counts[event.status] += 1
+                yield event
+            await cache.invalidate_itemize(resources.response_cache, username, slug)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    yield schemas.ImportLinksSummary(
+        total=len(urls),
+        imported=counts["imported"],
+        exists=counts["exists"],
+        failed=counts["failed"],
+    )
+
+
+async def _insert_links(rows: list[dict[str, Any]]) -> list[schemas.ImportLinkEvent]:
+    stmt = insert(models.Link).returning(models.Link.id, models.Link.url)
+    async with DB.session() as session:
+        try:
+            result = await session.execute(stmt, rows)
+            events = [
+                schemas.ImportLinkEvent(url=url, status="imported", link_id=link_id)
+                for link_id, url in result
+            ]
+            await session.commit()
+            return events
+        except IntegrityError:
+            await session.rollback()
+
+        # something else claimed one of the urls since the import started, so
+        # fall back to row by row inserts to find out which
+        events = []
+        for row in rows:
+            try:
+                async with session.begin_nested():
+                    link_id = await session.scalar(stmt.values(row))
+                events.append(
+                    schemas.ImportLinkEvent(
+                        url=row["url"], status="imported", link_id=link_id
+                    )
+                )
+            except IntegrityError:
+                events.append(
+                    schemas.ImportLinkEvent(
+                        url=row["url"], status="exists", detail="Link already exists!"
+                    )
+                )
+        await session.commit()
+        return events
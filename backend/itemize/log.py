@@ -0,0 +1,151 @@
+"""
+Logging setup.
+
+Records are handed to a queue and formatted and written by a listener thread,
+so request handlers never block on the log stream. Fields passed through
+extra= are emitted as structured fields (JSON with LOG_JSON) and long values
+are truncated. Verbose payloads should be guarded with sampled() so that they
+are only built for a fraction of calls.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+
+from itemize import metrics
+
+from itemize.config import CONFIG
+
+from typing import Any
+
+
+# attributes every LogRecord has, anything else came in through extra=
+_RECORD_ATTRIBUTES = set(logging.LogRecord("", 0, "", 0, None, None, None).__dict__) | {
+    "message",
+    "asctime",
+    "taskName",
+}
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def truncate(value: str, max_length: int | None = None) -> str:
+    max_length = max_length or CONFIG.LOG_MAX_FIELD_LENGTH
+    if len(value) <= max_length:
+        return value
+    return f"{value[:max_length]}...[{len(value) - max_length} more chars]"
+
+
+def sampled(logger: logging.Logger, level: int) -> bool:
+    """
+    Whether to emit a verbose record, checked before building its payload.
+    """
+    return logger.isEnabledFor(level) and random.random() < CONFIG.LOG_SAMPLE_RATE
+
+
+def extra_fields(record: logging.LogRecord) -> dict[str, Any]:
+    fields: dict[str, Any] = {}
+    for key, value in record.__dict__.items():
+        if key in _RECORD_ATTRIBUTES or key.startswith("_"):
+            continue
+        if isinstance(value, (bool, int, float)) or value is None:
+            fields[key] = value
+        elif isinstance(value, str):
+            fields[key] = truncate(value)
+        else:
+            fields[key] = truncate(json.dumps(value, default=str))
+    return fields
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        record.msg = truncate(record.getMessage())
+        record.args = None
+        return super().format(record)
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        line = super().formatMessage(record)
+        fields = extra_fields(record)
+        if not fields:
+            return line
+        return line + " " + " ".join(f"{key}={value}" for key, value in fields.items())
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": truncate(record.getMessage()),
+            **extra_fields(record),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that drops records instead of blocking or raising when the
+    listener falls behind.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # like the base class, but keep the traceback out of the message so
+        # the listener can format (and truncate) the two separately
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.LOG_RECORDS_DROPPED.inc()
+
+
+def setup() -> None:
+    global _listener
+
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(
+        JSONFormatter() if CONFIG.LOG_JSON else TextFormatter(CONFIG.LOG_FORMAT)
+    )
+    records: queue.Queue[logging.LogRecord] = queue.Queue(CONFIG.LOG_QUEUE_SIZE)
+    _listener = logging.handlers.QueueListener(
+        records, handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(shutdown)
+
+    root = logging.getLogger()
+    root.handlers = [DroppingQueueHandler(records)]
+    root.setLevel(logging.getLevelNamesMapping()[CONFIG.LOG_LEVEL])
+    for name, level in CONFIG.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(logging.getLevelNamesMapping()[level])
+
+
+def shutdown() -> None:
+    """
+    Flush queued records and stop the listener thread.
+    """
+    global _listener
+
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
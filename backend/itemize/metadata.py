@@ -1,45 +1,65 @@
-import logging
+import asyncio
 import httpx
-import extruct
-import w3lib.html
-import json
+import logging
 import pathlib
-import fake_useragent
-import pyppeteer
-import pyppeteer.browser
+import re
+import time
 
+from itemize import cache
 from itemize import schemas
 from itemize import models
 from itemize import errors
+from itemize import extractors
+from itemize import log
+from itemize import metrics
+from itemize import prices
+from itemize import tracing
 
 from itemize.config import CONFIG
+from itemize.extractors import FIELDS, DomainExtractor
+from itemize.resources import Resources
 
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from functools import reduce
 
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from typing import Any
+from typing import Any, Callable
+
+
+logger = logging.getLogger(__name__)
+
+HEAD_END = re.compile(r"</head\s*>", re.IGNORECASE)
+# any element with a microformats2 root class, e.g. h-product or h-card
+HAS_MICROFORMAT = "boolean(//*[starts-with(@class, 'h-') or contains(@class, ' h-')])"
 
 
 class MetadataParser:
-    def __init__(self, data: str, url: str) -> None:
+    def __init__(
+        self,
+        data: str,
+        url: str,
+        *,
+        extractor: DomainExtractor | None = None,
+        log_pagedata: bool = True,
+    ) -> None:
         self._data = data
         self._url = url
 
-        if CONFIG.PARSER_LOG_PAGEDATA:
+        if log_pagedata and CONFIG.PARSER_LOG_PAGEDATA:
             pathlib.Path("pagedata").mkdir(exist_ok=True)
             with open(f"pagedata/{datetime.utcnow().isoformat()}.html", "w") as f:
                 f.write(self._data)
 
-        self._metadata = extruct.extract(
-            data,
-            base_url=w3lib.html.get_base_url(data, str(url)),
-            uniform=True,
-            errors="log",
-        )
+        # extruct pulls in lxml, rdflib and mf2py, so it is imported on the
+        # first parse rather than when a worker boots
+        import extruct
+        import extruct.utils
+        import w3lib.html
 
         # fields
         self.title: str | None = None
@@ -49,41 +69,52 @@ class MetadataParser:
         self.price: str | None = None
         self.currency: str | None = None
 
+        # the page is parsed once, for the extractor and then for extruct
+        tree = extruct.utils.parse_xmldom_html(data, encoding="UTF-8")
+        if extractor is not None:
+            for field, value in extractor.extract(tree).items():
+                setattr(self, field, value)
+
+        self._metadata: dict[str, list[dict[str, Any]]] = {}
+        if all(getattr(self, field) is not None for field in FIELDS):
+            return
+        base_url = w3lib.html.get_base_url(data, str(url))
+        syntaxes = [format for format in self.FORMATS if format != "microformat"]
+        self._metadata = extruct.extract(
+            tree, base_url=base_url, syntaxes=syntaxes, uniform=True, errors="log"
+        )
+        # mf2py only works on the markup, so it costs a second parse of the
+        # page; skip it unless some element has a microformats2 root class
+        if "microformat" in self.FORMATS and tree.xpath(HAS_MICROFORMAT):
+            self._metadata |= extruct.extract(
+                data,
+                base_url=base_url,
+                syntaxes=["microformat"],
+                uniform=True,
+                errors="log",
+            )
+
     def parse(self) -> None:
-        logging.info(json.dumps(self._metadata))
-
-        parer_get_methods = {
-            "dublincore": self._dublincore_get,
-            "json-ld": self._json_ld_get,
-            # 'microdata': self._microdata_get,
-            # 'microformat': self._microformat_get,
-            "opengraph": self._opengraph_get,
-            "rdfa": self._rdfa_get,
-        }
-        format_rank = [
-            "opengraph",
-            "rdfa",
-            "json-ld",
-            "dublincore",
-            "microdata",
-            "microformat",
-        ]
-        fields = ["title", "site_name", "description", "image_url", "price", "currency"]
+        if log.sampled(logger, logging.DEBUG):
+            logger.debug(
+                "Extracted metadata",
+                extra={"url": self._url, "metadata": self._metadata},
+            )
 
-        for format in format_rank:
-            if format not in parer_get_methods:
+        for format, index in self.FORMATS.items():
+            missing = [field for field in FIELDS if getattr(self, field) is None]
+            if not missing:
+                break
+            if format not in self._metadata:
                 continue
-            get = parer_get_methods[format]
-            for field in fields:
-                if getattr(self, field) is not None:
-                    continue
-                value = get(field)
-                if value is not None:
-                    setattr(self, field, value)
+            values = index(self)
+            for field in missing:
+                if field in values:
+                    setattr(self, field, values[field])
 
-    def _dublincore_get(self, key: str) -> str | None:
+    def _dublincore_index(self) -> dict[str, str]:
         """
-        Parse dublincore metadata.
+        Index dublincore metadata.
 
         Schema approx:
         [
@@ -101,96 +132,96 @@ class MetadataParser:
             ...
         ]
         """
-        if "dublincore" not in self._metadata:
-            return None
-
-        key_translations: dict[str, str] = {}
-        if key in key_translations:
-            key = key_translations[key]
-
-        elements = map(lambda x: x["elements"], self._metadata["dublincore"])
-
-        combined_elements: list[dict[str, Any]] = reduce(
-            lambda x, y: x + y, elements, []
-        )
-
-        filtered_elements = filter(lambda x: x["name"] == key, combined_elements)
-
-        content = next(map(lambda x: x["content"], filtered_elements), None)
-
-        if content is None:
-            return None
-        return str(content)
-
-    def _json_ld_get(self, key: str) -> str | None:
+        values: dict[str, str] = {}
+        for item in self._metadata["dublincore"]:
+            for element in item["elements"]:
+                if element["name"] in FIELDS and element.get("content") is not None:
+                    values.setdefault(element["name"], str(element["content"]))
+        return values
+
+    def _json_ld_index(self) -> dict[str, str]:
         """
-        Parse json-ld metadata.
+        Index json-ld metadata.
 
         Schema approx:
         [
             {
                 '@context': ...,
                 '@id': ...,
-                '@type': ..., // Organization/Product/etc.
-                'name': ... // not title
+                '@type': ..., // Organization/Product/etc. or a list of them
+                'name': ..., // not title
+                'offers': ... // Offer, list of Offers or an @id reference
+            },
+            {
+                '@context': ...,
+                '@graph': [...] // several nodes, referencing each other by @id
             }
         ]
         """
-        if "json-ld" not in self._metadata:
-            return None
+        return SchemaOrgGraph(self._metadata["json-ld"]).index()
 
-        key_translations = {
-            "title": "name",
-            "image_url": "image",
-        }
-        key_types = {
-            "title": "Product",
-            "description": "Product",
-            "image_url": "Product",
-            "price": "Product",
-            "currency": "Product",
-            "site_name": "Organization",
-        }
-        properties = list(
-            filter(
-                lambda x: x.get("@type") == key_types.get(key, "Product"),
-                self._metadata["json-ld"],
-            )
-        )
-        if len(properties) == 0:
-            return None
-
-        if key in key_translations:
-            key = key_translations[key]
-
-        for prop in properties:
-            value = prop.get(key, None)
-            if value is None:
-                continue
-            if key == "image" and isinstance(value, list) and len(value) > 0:
-                return str(value[0])
-            return str(value)
-        return None
-
-    def _microdata_get(self, key: str) -> str | None:
+    def _microdata_index(self) -> dict[str, str]:
         """
-        Parse microdata metadata.
+        Index schema.org microdata.
 
-        TODO: I do not know what the microdata is structured like.
+        Schema approx:
+        [
+            {
+                '@context': 'https://schema.org',
+                '@type': 'Product',
+                'name': ...,
+                'image': ...,
+                'offers': {
+                    '@type': 'Offer',
+                    'price': ...,
+                    'priceCurrency': ...
+                }
+            },
+            ...
+        ]
         """
-        raise NotImplementedError()
+        return SchemaOrgGraph(self._metadata["microdata"]).index()
 
-    def _microformat_get(self, key: str) -> str | None:
+    def _microformat_index(self) -> dict[str, str]:
         """
-        Parse microformat metadata.
+        Index microformats2 metadata, h-product for the product and the
+        name of a top level h-card for the site.
 
-        TODO: I do not know what the microformat is structured like.
+        Schema approx:
+        [
+            {
+                '@type': ['h-product'],
+                'name': [...],
+                'photo': [...], // url, or {'value': url, 'alt': ...}
+                'description': [...], // e- properties are {'html': ..., 'value': ...}
+                'price': [...]
+            },
+            ...
+        ]
         """
-        raise NotImplementedError()
+        key_translations = {
+            "title": "name",
+            "description": "description",
+            "image_url": "photo",
+            "price": "price",
+        }
+        values: dict[str, str] = {}
+        for item in self._metadata["microformat"]:
+            types = item.get("@type", [])
+            if "h-product" in types:
+                for field, key in key_translations.items():
+                    value = first_text(item.get(key))
+                    if value is not None:
+                        values.setdefault(field, value)
+            elif "h-card" in types:
+                value = first_text(item.get("name"))
+                if value is not None:
+                    values.setdefault("site_name", value)
+        return values
 
-    def _opengraph_get(self, key: str) -> str | None:
+    def _opengraph_index(self) -> dict[str, str]:
         """
-        Parse opengraph metadata.
+        Index opengraph metadata.
 
         Schema approx:
         [
@@ -202,9 +233,6 @@ class MetadataParser:
             ...
         ]
         """
-        if "opengraph" not in self._metadata:
-            return None
-
         key_translations = {
             "title": "og:title",
             "site_name": "og:site_name",
@@ -213,21 +241,18 @@ class MetadataParser:
             "price": "product:price:amount",
             "currency": "product:price:currency",
         }
-        if key in key_translations:
-            key = key_translations[key]
-
         properties: dict[str, Any] = reduce(
             lambda x, y: y | x, self._metadata["opengraph"], {}
         )
+        return {
+            field: str(properties[key])
+            for field, key in key_translations.items()
+            if properties.get(key) is not None
+        }
 
-        value = properties.get(key, None)
-        if value is None:
-            return None
-        return str(value)
-
-    def _rdfa_get(self, key: str) -> str | None:
+    def _rdfa_index(self) -> dict[str, str]:
         """
-        Parse rfda metadata.
+        Index rfda metadata.
 
         Schema approx:
         [
@@ -244,9 +269,6 @@ class MetadataParser:
             }
         ]
         """
-        if "rdfa" not in self._metadata:
-            return None
-
         key_translations = {
             "title": "http://ogp.me/ns#title",
             "site_name": "http://ogp.me/ns#site_name",
@@ -255,25 +277,252 @@ class MetadataParser:
             "price": "product:price:amount",
             "currency": "product:price:currency",
         }
-        if key in key_translations:
-            key = key_translations[key]
-
         page_properties = next(
             filter(lambda x: x["@id"] == self._url, self._metadata["rdfa"]), None
         )
-
         if page_properties is None:
-            return None
+            return {}
 
-        value = page_properties.get(key, None)
-        if value is None:
-            return None
+        values: dict[str, str] = {}
+        for field, key in key_translations.items():
+            value = page_properties.get(key, None)
+            if value is None:
+                continue
+            grouped_values: dict[str, Any] = reduce(lambda x, y: y | x, value, {})
+            if "@value" in grouped_values:
+                values[field] = str(grouped_values["@value"])
+        return values
+
+    # extruct syntax -> index of its values by field, in order of preference;
+    # only these syntaxes are extracted
+    FORMATS: dict[str, Callable[["MetadataParser"], dict[str, str]]] = {
+        "opengraph": _opengraph_index,
+        "rdfa": _rdfa_index,
+        "json-ld": _json_ld_index,
+        "dublincore": _dublincore_index,
+        "microdata": _microdata_index,
+        "microformat": _microformat_index,
+    }
+
+
+def first_text(value: Any) -> str | None:
+    """
+    First non empty text of a metadata value, which may be a list, a nested
+    item with a value (microformats) or an ImageObject style url.
+    """
+    if isinstance(value, list):
+        return next(filter(None, map(first_text, value)), None)
+    if isinstance(value, dict):
+        for key in ("value", "url", "contentUrl", "@value"):
+            if key in value:
+                return first_text(value[key])
+        return None
+    if value is None:
+        return None
+    text = " ".join(str(value).split())
+    return text or None
+
+
+def schema_types(item: dict[str, Any]) -> list[str]:
+    types = item.get("@type", [])
+    if not isinstance(types, list):
+        types = [types]
+    # https://schema.org/Product and schema:Product -> Product
+    return [str(type_).replace(":", "/").rsplit("/", 1)[-1] for type_ in types]
+
+
+class SchemaOrgGraph:
+    """
+    schema.org items, from JSON-LD or microdata, flattened once into a table
+    of nodes indexed by @id and by type. Fields are then resolved along typed
+    paths (e.g. Product -> offers -> priceSpecification -> price) through
+    those indexes, following @id references, instead of rescanning the
+    documents for every field.
+    """
+
+    PRODUCT_TYPES = ("Product", "ProductGroup", "IndividualProduct", "ProductModel")
+    SITE_TYPES = ("OnlineStore", "Store", "Organization", "WebSite")
+
+    def __init__(self, items: list[dict[str, Any]]) -> None:
+        self.by_id: dict[str, dict[str, Any]] = {}
+        self.by_type: dict[str, list[dict[str, Any]]] = {}
+        # ids of top level nodes; nested organizations are brands, sellers or
+        # manufacturers rather than the site itself
+        self._top_level: set[int] = set()
+        self._top_level_nodes: list[dict[str, Any]] = []
+        self._add(items, top_level=True)
+
+    def _add(self, value: Any, *, top_level: bool) -> None:
+        if isinstance(value, list):
+            for item in value:
+                self._add(item, top_level=top_level)
+            return
+        if not isinstance(value, dict):
+            return
+        if "@graph" in value:
+            self._add(value["@graph"], top_level=top_level)
+
+        node = value
+        node_id = value.get("@id")
+        if isinstance(node_id, str) and len(value) > 1:
+            # the same node may be described in several places, merge them
+            node = self.by_id.setdefault(node_id, value)
+            if node is not value:
+                for key, property_ in value.items():
+                    node.setdefault(key, property_)
+        if node is value:
+            for type_ in schema_types(value):
+                self.by_type.setdefault(type_, []).append(value)
+        if top_level and id(node) not in self._top_level:
+            self._top_level.add(id(node))
+            self._top_level_nodes.append(node)
+
+        for key, property_ in value.items():
+            if key != "@graph" and isinstance(property_, (list, dict)):
+                self._add(property_, top_level=False)
+
+    def resolve(self, value: Any) -> Any:
+        if isinstance(value, dict) and set(value) == {"@id"}:
+            return self.by_id.get(value["@id"], value)
+        return value
+
+    def nodes(
+        self, types: tuple[str, ...], *, top_level: bool = False
+    ) -> list[dict[str, Any]]:
+        nodes = [node for type_ in types for node in self.by_type.get(type_, [])]
+        if top_level:
+            nodes = [node for node in nodes if id(node) in self._top_level]
+        else:
+            # e.g. a ProductGroup before its variants
+            nodes.sort(key=lambda node: id(node) not in self._top_level)
+        return list({id(node): node for node in nodes}.values())
+
+    def follow(self, nodes: list[Any], path: str) -> list[Any]:
+        """
+        Values at a dotted path from each of nodes, lists flattened and
+        references resolved along the way.
+        """
+        for key in path.split("."):
+            values: list[Any] = []
+            for node in map(self.resolve, nodes):
+                if isinstance(node, dict) and key in node:
+                    value = node[key]
+                    values.extend(value if isinstance(value, list) else [value])
+            nodes = values
+        return [self.resolve(node) for node in nodes]
+
+    def first(self, nodes: list[Any], *paths: str) -> str | None:
+        for path in paths:
+            for node in nodes:
+                value = first_text(self.follow([node], path))
+                if value is not None:
+                    return value
+        return None
 
-        grouped_values: dict[str, Any] = reduce(lambda x, y: y | x, value, {})
-        if "@value" not in grouped_values:
-            return None
+    def offer_fields(self, offers: list[Any]) -> dict[str, str]:
+        """
+        Price and currency of the first priced offer, from the offer itself
+        or its priceSpecification; AggregateOffers only have a lowPrice.
+        """
+        for offer in offers:
+            if not isinstance(offer, dict):
+                continue
+            for source in [offer, *self.follow([offer], "priceSpecification")]:
+                price = self.first([source], "price", "lowPrice")
+                if price is not None:
+                    values = {"price": price}
+                    currency = self.first([source], "priceCurrency")
+                    if currency is not None:
+                        values["currency"] = currency
+                    return values
+        return {}
+
+    def primary_product(self) -> dict[str, Any] | None:
+        """
+        The product the page is about: the mainEntity of a top level node,
+        otherwise the first top level product, otherwise the first product.
+        Related, similar or accessory products nested in it are not.
+        """
+        for entity in self.follow(self._top_level_nodes, "mainEntity"):
+            if isinstance(entity, dict) and set(schema_types(entity)) & set(
+                self.PRODUCT_TYPES
+            ):
+                return entity
+        products = self.nodes(self.PRODUCT_TYPES)
+        return products[0] if products else None
+
+    def index(self) -> dict[str, str]:
+        product = self.primary_product()
+        products = [product] if product is not None else []
+        # a ProductGroup's offers usually sit on its variants
+        variants = self.follow(products, "hasVariant")
+        offers = self.follow(products, "offers") + self.follow(variants, "offers")
+        values = {
+            "title": self.first(products, "name"),
+            "description": self.first(products, "description"),
+            "image_url": self.first(products, "image", "hasVariant.image"),
+            "site_name": self.first(self.nodes(self.SITE_TYPES, top_level=True), "name")
+            or self.first(offers, "seller.name"),
+            # some pages put the price on the product itself
+            **(self.offer_fields(offers) or self.offer_fields(products + variants)),
+        }
+        return {field: value for field, value in values.items() if value is not None}
+
+
+@dataclass
+class ParsedPage:
+    title: str | None
+    site_name: str | None
+    description: str | None
+    image_url: str | None
+    price: str | None
+    currency: str | None
+    extractor: str | None
+    extract_seconds: float
+    parse_seconds: float
+
+
+def parse_page(data: str, url: str, log_pagedata: bool = True) -> ParsedPage:
+    """
+    Extract and parse a page. Runs in the parser pool's worker processes, so
+    the timings are returned for the caller to record.
+    """
+    start = time.perf_counter()
+    extractor = extractors.REGISTRY.for_url(url)
+    parser = MetadataParser(data, url, extractor=extractor, log_pagedata=log_pagedata)
+    extracted = time.perf_counter()
+    parser.parse()
+    return ParsedPage(
+        title=parser.title,
+        site_name=parser.site_name,
+        description=parser.description,
+        image_url=parser.image_url,
+        price=parser.price,
+        currency=parser.currency,
+        extractor=extractor.name if extractor is not None else None,
+        extract_seconds=extracted - start,
+        parse_seconds=time.perf_counter() - extracted,
+    )
 
-        return str(grouped_values["@value"])
+
+async def read_page(response: httpx.Response, *, head_only: bool) -> str:
+    """
+    Read a page body, or with head_only only up to the end of its <head>,
+    closing the connection instead of downloading the rest.
+    """
+    if not head_only:
+        await response.aread()
+        return response.text
+
+    text = ""
+    async for chunk in response.aiter_text():
+        # the closing tag may straddle two chunks
+        search_from = max(len(text) - len("</head>"), 0)
+        text += chunk
+        end = HEAD_END.search(text, search_from)
+        if end is not None:
+            return text[: end.end()]
+    return text
 
 
 async def get_metadata_image(
@@ -300,9 +549,70 @@ async def get_metadata_from_db(
     return await metadata.to_schema()
 
 
+async def reserve_metadata(
+    session: AsyncSession, metadata: schemas.PageMetadata
+) -> bool:
+    """
+    Keep stored metadata from being garbage collected before the caller links
+    it, returning False if it already was.
+    """
+    # the collector spares rows updated within GC_GRACE_SECONDS, so refresh
+    # updated_at once half of it has passed and a link still has time to land
+    grace = timedelta(seconds=CONFIG.GC_GRACE_SECONDS / 2)
+    if metadata.updated_at >= datetime.utcnow() - grace:
+        return True
+    touched = await session.execute(
+        update(models.PageMetadata)
+        .where(models.PageMetadata.id == metadata.id)
+        .values(updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    return bool(touched.rowcount)
+
+
+async def fetch_metadata_image(
+    url: str, image_url: str | None, *, resources: Resources
+) -> models.MetadataImage | None:
+    if image_url in (None, ""):
+        if not CONFIG.SCREENSHOT_PAGE:
+            return None
+        with metrics.time_stage("screenshot"):
+            screenshot = await resources.browsers.screenshot(url)
+        return models.MetadataImage(
+            mime="image/jpeg", data=screenshot, source_image_url=url
+        )
+    elif image_url is not None:
+        logger.debug("Downloading image", extra={"image_url": image_url})
+        with metrics.track_fetch("image", image_url) as fetch:
+            response = await resources.http.get(
+                image_url,
+                headers=resources.identity.headers(image_url, "image"),
+                follow_redirects=True,
+            )
+            fetch.status_code = response.status_code
+        logger.debug(
+            "Downloaded image",
+            extra={
+                "image_url": image_url,
+                "status_code": response.status_code,
+                "content_type": response.headers.get("Content-Type"),
+                "content_length": len(response.content),
+            },
+        )
+        if response.status_code == 200:
+            return models.MetadataImage(
+                mime=response.headers.get("Content-Type", None),
+                data=response.content,
+                source_image_url=image_url,
+            )
+    return None
+
+
 async def save_metadata(
     session: AsyncSession,
     *,
+    resources: Resources,
     url: str,
     title: str | None,
     description: str | None,
@@ -311,9 +621,19 @@ async def save_metadata(
     price: str | None,
     currency: str | None,
 ) -> schemas.PageMetadata:
+    # do the network work up front so the writes below are a single short
+    # transaction: generated keys come back through INSERT ... RETURNING and
+    # the image is linked by relationship assignment instead of round trips
+    with tracing.span("itemize.fetch_metadata_image"):
+        image = await fetch_metadata_image(url, image_url, resources=resources)
+    price_minor, currency_code = prices.normalize(price, currency)
+
     metadata = await session.scalar(
-        select(models.PageMetadata).where(models.PageMetadata.url == url)
+        select(models.PageMetadata)
+        .where(models.PageMetadata.url == url)
+        .options(joinedload(models.PageMetadata.image))
     )
+    refreshed = metadata is not None
     if metadata is not None:
         metadata.title = title
         metadata.description = description
@@ -321,6 +641,8 @@ async def save_metadata(
         metadata.image_url = image_url
         metadata.price = price
         metadata.currency = currency
+        metadata.price_minor = price_minor
+        metadata.currency_code = currency_code
     else:
         metadata = models.PageMetadata(
             url=url,
@@ -330,90 +652,113 @@ async def save_metadata(
             image_url=image_url,
             price=price,
             currency=currency,
+            price_minor=price_minor,
+            currency_code=currency_code,
         )
         session.add(metadata)
-    await session.commit()
-    await session.refresh(metadata)
-
-    # https://stackoverflow.com/questions/59270710/python-pyppeteer-proxy-usage
-    if metadata.image_url in (None, ""):
-        if CONFIG.SCREENSHOT_PAGE:
-            browser = await pyppeteer.launch()
-            try:
-                page = await browser.newPage()
-                await page.goto(metadata.url)
-                ss = await page.screenshot({"type": "jpeg"})
-            finally:
-                await browser.close()
-            if isinstance(ss, str):
-                ss = ss.encode("utf-8")
-            image = models.MetadataImage(
-                mime="image/jpeg", data=ss, source_image_url=metadata.url
-            )
-            session.add(image)
-            await session.commit()
-            await session.refresh(image)
-            metadata.image_id = image.id
+    if image is not None:
+        metadata.image = image
+    with tracing.span("itemize.save_metadata.commit"):
+        try:
             await session.commit()
-            await session.refresh(metadata, ["image"])
-    elif metadata.image_url is not None:
-        print(f"{metadata.image_url=}")
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            user_agent_header = fake_useragent.UserAgent().random
-            response = await client.get(
-                metadata.image_url, headers={"User-Agent": user_agent_header}
+        except IntegrityError:
+            # the same page was fetched concurrently, possibly by another
+            # server worker, and that one was stored first
+            await session.rollback()
+            stored = await get_metadata_from_db(session, url)
+            if stored is None:
+                raise
+            return stored
+    resources.price_history.record(metadata.id, price_minor, currency_code)
+
+    if refreshed:
+        with tracing.span("itemize.invalidate_cache"):
+            await cache.invalidate_page_metadata(
+                session, resources.response_cache, metadata.id
             )
-            logging.debug(
-                f"Got response for downloading image: {response.status_code=}"
-                f" {response.headers=} {response.content=}"
-            )
-            if response.status_code == 200:
-                image = models.MetadataImage(
-                    mime=response.headers.get("Content-Type", None),
-                    data=response.content,
-                    source_image_url=metadata.image_url,
-                )
-                session.add(image)
-                await session.commit()
-                await session.refresh(image)
-                metadata.image_id = image.id
-                await session.commit()
-                await session.refresh(metadata, ["image"])
 
     db_schema = await metadata.to_schema()
     return db_schema
 
 
 async def get_metadata(
-    session: AsyncSession, url: str, *, cache_only: bool = False
+    session: AsyncSession,
+    url: str,
+    *,
+    resources: Resources,
+    cache_only: bool = False,
 ) -> schemas.PageMetadata | None:
-    if (metadata := await get_metadata_from_db(session, url)) is not None:
-        return metadata
-    if cache_only:
-        return None
+    with tracing.span("itemize.get_metadata", **{"http.url": url}):
+        metadata = await get_metadata_from_db(session, url)
+        if metadata is not None and not await reserve_metadata(session, metadata):
+            # garbage collected since, fetch it again
+            metadata = None
+        metrics.record_cache("page_metadata", metadata is not None)
+        if metadata is not None:
+            return metadata
+        if cache_only:
+            return None
 
-    async with httpx.AsyncClient() as client:
-        user_agent_header = fake_useragent.UserAgent().random
-        response = await client.get(url, headers={"User-Agent": user_agent_header})
+        _, page = await fetch_page(url, resources=resources)
+        with tracing.span("itemize.save_metadata"):
+            return await save_metadata(
+                session,
+                resources=resources,
+                url=url,
+                title=page.title,
+                description=page.description,
+                site_name=page.site_name,
+                image_url=page.image_url,
+                price=page.price,
+                currency=page.currency,
+            )
 
-    parser = MetadataParser(response.text, str(response.url))
-    parser.parse()
 
-    logging.info(
-        f"{parser.title=} "
-        f"{parser.site_name=} "
-        f"{parser.description=} "
-        f"{parser.image_url=} "
-        f"{parser.price=} "
-        f"{parser.currency=}"
-    )
-    return await save_metadata(
-        session,
-        url=url,
-        title=parser.title,
-        description=parser.description,
-        site_name=parser.site_name,
-        image_url=parser.image_url,
-        price=parser.price,
-        currency=parser.currency,
+async def fetch_page(
+    url: str, *, resources: Resources, log_pagedata: bool = True
+) -> tuple[int, ParsedPage]:
+    """
+    Download and parse a page, returning the response status and the page.
+    Without log_pagedata the page is neither dumped to pagedata/ nor its
+    metadata logged at INFO, for callers that refetch pages in bulk.
+    """
+    extractor = extractors.REGISTRY.for_url(url)
+    head_only = extractor is not None and extractor.head_only
+    with metrics.track_fetch("page", url) as fetch:
+        async with resources.http.stream(
+            "GET", url, headers=resources.identity.headers(url)
+        ) as response:
+            fetch.status_code = response.status_code
+            text = await read_page(response, head_only=head_only)
+
+    with tracing.span("itemize.parse_page"):
+        if resources.parser_pool is None:
+            page = parse_page(text, str(response.url), log_pagedata)
+        else:
+            page = await asyncio.get_running_loop().run_in_executor(
+                resources.parser_pool,
+                parse_page,
+                text,
+                str(response.url),
+                log_pagedata,
+            )
+    metrics.observe_stage("extract", page.extract_seconds)
+    metrics.observe_stage("parse", page.parse_seconds)
+
+    logger.log(
+        logging.INFO if log_pagedata else logging.DEBUG,
+        "Parsed metadata",
+        extra={
+            "url": url,
+            "extractor": page.extractor,
+            "status_code": response.status_code,
+            "page_length": len(text),
+            "title": page.title,
+            "site_name": page.site_name,
+            "description": page.description,
+            "image_url": page.image_url,
+            "price": page.price,
+            "currency": page.currency,
+        },
     )
+    return response.status_code, page
@@ -0,0 +1,155 @@
+import time
+
+from itemize import extractors
+from itemize import tracing
+
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from typing import Any, Iterator
+
+
+STAGE_SECONDS = Histogram(
+    "itemize_stage_seconds",
+    "Time spent in each stage of the metadata and serialization pipeline.",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+FETCHES = Counter(
+    "itemize_fetches_total",
+    "Outbound HTTP fetches by kind, site (the extractor, otherwise other) and outcome.",
+    ["kind", "site", "outcome"],
+)
+DB_QUERY_SECONDS = Histogram(
+    "itemize_db_query_seconds",
+    "Time spent executing SQL statements, by statement type.",
+    ["operation"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1),
+)
+CACHE_REQUESTS = Counter(
+    "itemize_cache_requests_total",
+    "Cache lookups by cache and result (hit or miss).",
+    ["cache", "result"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "itemize_http_request_seconds",
+    "Time spent handling API requests, by route template.",
+    ["method", "route", "status"],
+)
+LOG_RECORDS_DROPPED = Counter(
+    "itemize_log_records_dropped_total",
+    "Log records dropped because the log queue was full.",
+)
+PRICE_OBSERVATIONS = Counter(
+    "itemize_price_observations_total",
+    "Price observations by how they were stored (new run, extended run, dropped).",
+    ["result"],
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "itemize_db_pool_connections",
+    "Database pool connections by state, sampled on scrape.",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+
+
+@contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    with tracing.span(f"itemize.{stage}"), STAGE_SECONDS.labels(stage).time():
+        yield
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """
+    Record a stage that was timed elsewhere, e.g. in a worker process.
+    """
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+class FetchOutcome:
+    def __init__(self) -> None:
+        self.status_code: int | None = None
+
+    @property
+    def outcome(self) -> str:
+        if self.status_code is None:
+            return "error"
+        if self.status_code < 400:
+            return "ok"
+        return f"http_{self.status_code // 100}xx"
+
+
+def fetch_domain(url: str) -> str:
+    return (urlsplit(url).hostname or "unknown").removeprefix("www.")
+
+
+def fetch_site(url: str) -> str:
+    """
+    Bounded label for a fetched URL: the name of the extractor registered for
+    its host, or "other", so arbitrary user URLs cannot add label values.
+    """
+    extractor = extractors.REGISTRY.for_url(url)
+    return "other" if extractor is None else extractor.name
+
+
+@contextmanager
+def track_fetch(kind: str, url: str) -> Iterator[FetchOutcome]:
+    """
+    Time an outbound fetch and count its outcome per site. Set status_code on
+    the yielded object once a response arrives; exceptions count as errors.
+    """
+    fetch = FetchOutcome()
+    domain = fetch_domain(url)
+    try:
+        with time_stage(f"{kind}_fetch"):
+            tracing.set_attributes(**{"http.url": url, "itemize.domain": domain})
+            yield fetch
+            if fetch.status_code is not None:
+                tracing.set_attributes(**{"http.status_code": fetch.status_code})
+    finally:
+        FETCHES.labels(kind, fetch_site(url), fetch.outcome).inc()
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_price_observations(result: str, count: int = 1) -> None:
+    PRICE_OBSERVATIONS.labels(result).inc(count)
+
+
+def _before_cursor_execute(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    # statements on one connection never overlap, so a single slot suffices;
+    # a failed statement just leaves a value for the next one to overwrite
+    conn.info["itemize_query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    started = conn.info.pop("itemize_query_start", None)
+    if started is None:
+        return
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+    DB_QUERY_SECONDS.labels(operation).observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey
+from sqlalchemy import BigInteger, ForeignKey, Index, String
 from sqlalchemy.orm import (
     DeclarativeBase,
     Mapped,
@@ -74,9 +74,20 @@ class PageMetadata(Base):
     site_name: Mapped[str | None]
     price: Mapped[str | None]
     currency: Mapped[str | None]
+    price_minor: Mapped[int | None] = mapped_column(
+        BigInteger, index=True, comment="Price in minor units of currency_code"
+    )
+    currency_code: Mapped[str | None] = mapped_column(
+        String(3), index=True, comment="ISO 4217 currency code"
+    )
+    checked_at: Mapped[datetime | None] = mapped_column(
+        default=None, comment="Time the price watcher last checked the page"
+    )
 
     image_id: Mapped[int | None] = mapped_column(
-        ForeignKey("metadataimage.id"), comment="Foreign key to locally stored image"
+        ForeignKey("metadataimage.id"),
+        index=True,
+        comment="Foreign key to locally stored image",
     )
     image: Mapped[Optional["MetadataImage"]] = relationship(
         "MetadataImage", lazy="raise"
@@ -100,11 +111,59 @@ class PageMetadata(Base):
             site_name=self.site_name,
             price=self.price,
             currency=self.currency,
+            price_minor=self.price_minor,
+            currency_code=self.currency_code,
             image_id=self.image_id,
             image=image,
         )
 
 
+class PriceObservation(Base):
+    # one row per run of unchanged prices, runs older than PRICE_HISTORY_RAW_DAYS
+    # are merged into one row per day; also serves as the foreign key index
+    __table_args__ = (
+        Index(
+            "ix_priceobservation_page_metadata_id_first_seen_at",
+            "page_metadata_id",
+            "first_seen_at",
+        ),
+    )
+
+    page_metadata_id: Mapped[int] = mapped_column(
+        ForeignKey("pagemetadata.id"), comment="Foreign key to page metadata"
+    )
+    currency_code: Mapped[str | None] = mapped_column(
+        String(3), comment="ISO 4217 currency code"
+    )
+    price_minor: Mapped[int] = mapped_column(
+        BigInteger, comment="Latest price of the run in minor units"
+    )
+    low_minor: Mapped[int] = mapped_column(
+        BigInteger, comment="Lowest price of the run in minor units"
+    )
+    high_minor: Mapped[int] = mapped_column(
+        BigInteger, comment="Highest price of the run in minor units"
+    )
+    first_seen_at: Mapped[datetime] = mapped_column(
+        comment="Time of the first observation in the run"
+    )
+    last_seen_at: Mapped[datetime] = mapped_column(
+        comment="Time of the latest observation in the run"
+    )
+    samples: Mapped[int] = mapped_column(
+        default=1, comment="Number of observations in the run"
+    )
+
+
+class JobRun(Base):
+    name: Mapped[str] = mapped_column(
+        index=True, unique=True, comment="Name of the periodic job"
+    )
+    last_run_at: Mapped[datetime] = mapped_column(
+        comment="Time a worker last claimed a run of the job"
+    )
+
+
 class PageMetadataOverride(Base):
     image_url: Mapped[str | None]
     title: Mapped[str | None]
@@ -112,9 +171,17 @@ class PageMetadataOverride(Base):
     site_name: Mapped[str | None]
     price: Mapped[str | None]
     currency: Mapped[str | None]
+    price_minor: Mapped[int | None] = mapped_column(
+        BigInteger, index=True, comment="Price in minor units of currency_code"
+    )
+    currency_code: Mapped[str | None] = mapped_column(
+        String(3), index=True, comment="ISO 4217 currency code"
+    )
 
     image_id: Mapped[int | None] = mapped_column(
-        ForeignKey("metadataimage.id"), comment="Foreign key to locally stored image"
+        ForeignKey("metadataimage.id"),
+        index=True,
+        comment="Foreign key to locally stored image",
     )
     image: Mapped[Optional["MetadataImage"]] = relationship(
         "MetadataImage", lazy="raise"
@@ -137,6 +204,8 @@ class PageMetadataOverride(Base):
             site_name=self.site_name,
             price=self.price,
             currency=self.currency,
+            price_minor=self.price_minor,
+            currency_code=self.currency_code,
             image_id=self.image_id,
             image=image,
         )
@@ -148,6 +217,9 @@ class User(Base):
     first_name: Mapped[str]
     last_name: Mapped[str]
     hashed_password: Mapped[bytes]
+    token_version: Mapped[int] = mapped_column(
+        default=0, comment="Bumped to revoke every issued token"
+    )
 
     itemizes: Mapped[list["Itemize"]] = relationship(
         "Itemize", back_populates="user", lazy="raise"
@@ -173,15 +245,23 @@ class User(Base):
 
 
 class Link(Base):
+    # also serves as the itemize_id foreign key index
+    __table_args__ = (
+        Index("ix_link_itemize_id_created_at", "itemize_id", "created_at"),
+    )
+
     url: Mapped[str] = mapped_column(index=True, unique=True, comment="Link URL")
     itemize_id: Mapped[int] = mapped_column(
         ForeignKey("itemize.id"), comment="Foreign key to itemize"
     )
     page_metadata_id: Mapped[int] = mapped_column(
-        ForeignKey("pagemetadata.id"), comment="Foreign key to page metadata"
+        ForeignKey("pagemetadata.id"),
+        index=True,
+        comment="Foreign key to page metadata",
     )
     page_metadata_override_id: Mapped[int | None] = mapped_column(
         ForeignKey("pagemetadataoverride.id"),
+        index=True,
         comment="Foreign key to page metadata override",
     )
     page_metadata: Mapped["PageMetadata"] = relationship("PageMetadata", lazy="raise")
@@ -228,8 +308,11 @@ class Link(Base):
 
 
 class Itemize(Base):
+    # slugs are unique per user, also serves as the user_id foreign key index
+    __table_args__ = (Index("ix_itemize_user_id_slug", "user_id", "slug", unique=True),)
+
     name: Mapped[str]
-    slug: Mapped[str] = mapped_column(index=True, comment="Itemize API slug")
+    slug: Mapped[str] = mapped_column(comment="Itemize API slug")
     description: Mapped[str | None]
     user_id: Mapped[int] = mapped_column(
         ForeignKey("user.id"), comment="Foreign key to owning user"
@@ -239,10 +322,10 @@ class Itemize(Base):
     )
     user: Mapped[User] = relationship("User", back_populates="itemizes", lazy="raise")
     links: Mapped[list[Link]] = relationship(
-        "Link", back_populates="itemize", lazy="raise"
+        "Link", back_populates="itemize", lazy="raise", order_by=Link.created_at
     )
 
-    async def to_schema(self, *, link_query: str | None = None) -> schemas.Itemize:
+    async def to_schema(self) -> schemas.Itemize:
         user = None
         links = None
 
@@ -254,22 +337,7 @@ class Itemize(Base):
 
         try:
             if self.links is not None:
-                links = [
-                    await link.to_schema()
-                    for link in self.links
-                    if link_query is None
-                    or (
-                        link.page_metadata is not None
-                        and (
-                            link_query in (link.page_metadata.title or "").lower()
-                            or link_query
-                            in (link.page_metadata.description or "").lower()
-                            or link_query
-                            in (link.page_metadata.site_name or "").lower()
-                            or link_query in (link.page_metadata.url or "").lower()
-                        )
-                    )
-                ]
+                links = [await link.to_schema() for link in self.links]
         except InvalidRequestError:
             pass
 
@@ -0,0 +1,29 @@
+import asyncio
+import bcrypt
+
+from itemize.config import CONFIG
+
+from concurrent.futures import Executor
+
+
+async def hash_password(password: str, executor: Executor) -> bytes:
+    salt = bcrypt.gensalt(rounds=CONFIG.PASSWORD_HASH_ROUNDS)
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, bcrypt.hashpw, password.encode("utf-8"), salt
+    )
+
+
+async def verify_password(
+    password: str, hashed_password: bytes, executor: Executor
+) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, bcrypt.checkpw, password.encode("utf-8"), hashed_password
+    )
+
+
+def needs_rehash(hashed_password: bytes) -> bool:
+    # bcrypt hashes look like $2b$<rounds>$<salt and hash>
+    parts = hashed_password.split(b"$")
+    if len(parts) != 4 or parts[1] != b"2b" or not parts[2].isdigit():
+        return True
+    return int(parts[2]) != CONFIG.PASSWORD_HASH_ROUNDS
@@ -0,0 +1,136 @@
+"""
+Price normalization.
+
+Prices arrive as whatever text the page used ("1.299,00 €", "$1,299", "129")
+with a currency that may be an ISO code, a symbol or missing. They are
+normalized into an integer amount in the currency's minor units (cents for
+USD, yen for JPY) and an ISO 4217 code, so they can be sorted, filtered and
+summed in SQL.
+"""
+import re
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+
+# active ISO 4217 currencies by the exponent of their minor unit, only these
+# are accepted as currency codes
+_CODES_BY_EXPONENT = {
+    0: "BIF CLP DJF GNF ISK JPY KMF KRW PYG RWF UGX UYI VND VUV XAF XOF XPF",
+    2: (
+        "AED AFN ALL AMD ANG AOA ARS AUD AWG AZN BAM BBD BDT BGN BMD BND BOB BOV "
+        "BRL BSD BTN BWP BYN BZD CAD CDF CHE CHF CHW CNY COP COU CRC CUP CVE CZK "
+        "DKK DOP DZD EGP ERN ETB EUR FJD FKP GBP GEL GHS GIP GMD GTQ GYD HKD HNL "
+        "HTG HUF IDR ILS INR IRR JMD KES KGS KHR KPW KYD KZT LAK LBP LKR LRD LSL "
+        "MAD MDL MGA MKD MMK MNT MOP MRU MUR MVR MWK MXN MXV MYR MZN NAD NGN NIO "
+        "NOK NPR NZD PAB PEN PGK PHP PKR PLN QAR RON RSD RUB SAR SBD SCR SDG SEK "
+        "SGD SHP SLE SOS SRD SSP STN SVC SYP SZL THB TJS TMT TOP TRY TTD TWD TZS "
+        "UAH USD USN UYU UZS VED VES WST XCD XCG YER ZAR ZMW ZWG"
+    ),
+    3: "BHD IQD JOD KWD LYD OMR TND",
+    4: "CLF UYW",
+}
+CURRENCY_EXPONENTS = {
+    code: exponent
+    for exponent, codes in _CODES_BY_EXPONENT.items()
+    for code in codes.split()
+}
+DEFAULT_EXPONENT = 2
+
+# longest first, so "US$" wins over "$"
+CURRENCY_SYMBOLS = {
+    "US$": "USD",
+    "CA$": "CAD",
+    "AU$": "AUD",
+    "NZ$": "NZD",
+    "HK$": "HKD",
+    "R$": "BRL",
+    "C$": "CAD",
+    "A$": "AUD",
+    "zł": "PLN",
+    "$": "USD",
+    "€": "EUR",
+    "£": "GBP",
+    "¥": "JPY",
+    "₹": "INR",
+    "₩": "KRW",
+    "₽": "RUB",
+    "₺": "TRY",
+    "₪": "ILS",
+}
+
+_CODE = re.compile(r"\b([A-Z]{3})\b")
+_AMOUNT = re.compile(r"\d(?:[\d.,'\s\u00a0\u202f]*\d)?")
+_GROUPING = re.compile(r"['\s\u00a0\u202f]")
+
+
+def exponent(currency_code: str | None) -> int:
+    return CURRENCY_EXPONENTS.get(currency_code or "", DEFAULT_EXPONENT)
+
+
+def parse_currency(*texts: str | None) -> str | None:
+    """
+    ISO code of the first text naming a currency, by code or by symbol. Three
+    letter words that are not ISO 4217 codes ("NOW $19.99") are skipped.
+    """
+    for text in texts:
+        if not text:
+            continue
+        if text.strip().upper() in CURRENCY_EXPONENTS:
+            return text.strip().upper()
+        for match in _CODE.finditer(text):
+            if match.group(1) in CURRENCY_EXPONENTS:
+                return match.group(1)
+        for symbol, code in CURRENCY_SYMBOLS.items():
+            if symbol in text:
+                return code
+    return None
+
+
+def parse_amount(text: str, currency_code: str | None = None) -> Decimal | None:
+    match = _AMOUNT.search(text)
+    if match is None:
+        return None
+    number = _GROUPING.sub("", match.group())
+
+    # the last separator is the decimal point if both are used ("1.299,00"),
+    # a lone separator is a decimal point unless it is followed by exactly
+    # as many digits as a thousands group ("1,299" or "1.299")
+    commas, dots = number.count(","), number.count(".")
+    if commas and dots:
+        decimal_point = "," if number.rfind(",") > number.rfind(".") else "."
+    elif commas + dots == 1:
+        separator = "," if commas else "."
+        fraction = number.rsplit(separator, 1)[1]
+        is_grouping = len(fraction) == 3 and exponent(currency_code) != 3
+        decimal_point = "" if is_grouping else separator
+    else:
+        decimal_point = ""
+
+    integer, _, fraction = (
+        number.rpartition(decimal_point) if decimal_point else (number, "", "")
+    )
+    try:
+        return Decimal(re.sub(r"[.,]", "", integer) + "." + (fraction or "0"))
+    except InvalidOperation:
+        return None
+
+
+def normalize(price: str | None, currency: str | None) -> tuple[int | None, str | None]:
+    """
+    Amount in minor units and ISO currency code of a scraped price.
+    """
+    currency_code = parse_currency(currency, price)
+    if price is None:
+        return None, currency_code
+    amount = parse_amount(price, currency_code)
+    if amount is None:
+        return None, currency_code
+    return to_minor(amount, currency_code), currency_code
+
+
+def to_minor(amount: Decimal, currency_code: str | None) -> int:
+    return int(amount.scaleb(exponent(currency_code)).quantize(1, ROUND_HALF_UP))
+
+
+def from_minor(amount_minor: int, currency_code: str | None) -> Decimal:
+    return Decimal(amount_minor).scaleb(-exponent(currency_code))
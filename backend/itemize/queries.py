@@ -0,0 +1,95 @@
+"""
+Hot lookup statements.
+
+Each statement is built inside a lambda_stmt, so SQLAlchemy constructs and
+caches it once per call site and later calls only bind new parameter values,
+skipping statement construction and cache key generation.
+"""
+from itemize import models
+
+from sqlalchemy import lambda_stmt, select
+from sqlalchemy.orm import contains_eager, joinedload
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+
+
+def itemize_by_owner(username: str, slug: str) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(models.Itemize)
+        .join(models.User)
+        .where(
+            models.User.username == username,
+            models.Itemize.slug == slug,
+        )
+    )
+
+
+def itemize_id_by_owner(username: str, slug: str) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(models.Itemize.id)
+        .join(models.User)
+        .where(
+            models.User.username == username,
+            models.Itemize.slug == slug,
+        )
+    )
+
+
+def itemize_with_user_by_owner(username: str, slug: str) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(models.Itemize)
+        .join(models.Itemize.user)
+        .where(
+            models.User.username == username,
+            models.Itemize.slug == slug,
+        )
+        .options(contains_eager(models.Itemize.user))
+    )
+
+
+def link_by_owner(username: str, slug: str, link_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(models.Link)
+        .join(models.Itemize)
+        .join(models.User)
+        .where(
+            models.User.username == username,
+            models.Itemize.slug == slug,
+            models.Link.id == link_id,
+        )
+    )
+
+
+def link_page_by_owner(
+    username: str, slug: str, link_id: int
+) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(models.Link.page_metadata_id, models.Itemize.public)
+        .join(models.Link.itemize)
+        .join(models.Itemize.user)
+        .where(
+            models.User.username == username,
+            models.Itemize.slug == slug,
+            models.Link.id == link_id,
+        )
+    )
+
+
+def link_with_metadata_by_owner(
+    username: str, slug: str, link_id: int
+) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(models.Link)
+        .join(models.Itemize)
+        .join(models.User)
+        .where(
+            models.User.username == username,
+            models.Itemize.slug == slug,
+            models.Link.id == link_id,
+        )
+        .options(
+            joinedload(models.Link.page_metadata).joinedload(models.PageMetadata.image),
+            joinedload(models.Link.page_metadata_override).joinedload(
+                models.PageMetadataOverride.image
+            ),
+        )
+    )
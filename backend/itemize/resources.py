@@ -0,0 +1,96 @@
+"""
+Long-lived resources shared by every request.
+
+The app lifespan opens one Resources per worker process and closes it on
+shutdown, routes receive it through the Resources dependency and pass it on
+to the functions that need it.
+"""
+import httpx
+import multiprocessing
+
+from itemize import browsers
+from itemize import cache
+from itemize import events
+from itemize import history
+from itemize import identity
+
+from itemize.config import CONFIG
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass
+
+from typing import AsyncIterator
+
+
+@dataclass
+class Resources:
+    # pooled client for page and image fetches, keeps connections alive per host
+    http: httpx.AsyncClient
+    identity: identity.RequestIdentity
+    browsers: browsers.BrowserPool
+    response_cache: cache.ResponseCache
+    # buffers price observations and writes them to the history in batches
+    price_history: history.PriceHistoryWriter
+    # price drops found by the watcher, for alerting consumers
+    price_drops: events.PriceDropQueue
+    # bcrypt releases the GIL, so a small thread pool keeps the event loop
+    # responsive and bounds how many hashes compete for CPU at once
+    password_pool: Executor
+    # extruct holds the GIL for tens of milliseconds per page, so pages are
+    # parsed in worker processes unless PARSER_WORKERS is 0
+    parser_pool: Executor | None
+
+
+@asynccontextmanager
+async def open_resources() -> AsyncIterator[Resources]:
+    async with AsyncExitStack() as stack:
+        http = await stack.enter_async_context(
+            httpx.AsyncClient(
+                timeout=CONFIG.FETCH_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=CONFIG.FETCH_MAX_CONNECTIONS,
+                    max_keepalive_connections=CONFIG.FETCH_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+            )
+        )
+
+        password_pool = ThreadPoolExecutor(
+            max_workers=CONFIG.PASSWORD_HASH_WORKERS,
+            thread_name_prefix="password-hash",
+        )
+        stack.callback(password_pool.shutdown)
+
+        parser_pool = None
+        if CONFIG.PARSER_WORKERS > 0:
+            # spawn rather than fork, the parent has threads running (logging,
+            # executors) whose locks a forked child could inherit held
+            parser_pool = ProcessPoolExecutor(
+                max_workers=CONFIG.PARSER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            stack.callback(parser_pool.shutdown, cancel_futures=True)
+
+        browser_pool = browsers.BrowserPool(max_pages=CONFIG.BROWSER_MAX_PAGES)
+        stack.push_async_callback(browser_pool.close)
+
+        response_cache = cache.create_response_cache()
+        stack.push_async_callback(response_cache.close)
+
+        price_history = history.create_writer()
+        price_history.start()
+        stack.push_async_callback(price_history.close)
+
+        price_drops = events.create_price_drop_queue()
+        stack.push_async_callback(price_drops.close)
+
+        yield Resources(
+            http=http,
+            identity=identity.create_identity(),
+            browsers=browser_pool,
+            response_cache=response_cache,
+            price_history=price_history,
+            price_drops=price_drops,
+            password_pool=password_pool,
+            parser_pool=parser_pool,
+        )
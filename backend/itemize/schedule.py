@@ -0,0 +1,67 @@
+"""
+Periodic jobs shared by every worker.
+
+A job's last run is kept in the database and claimed with a conditional
+UPDATE, so whichever worker polls first once the interval has passed runs it
+and the others skip that round. The schedule survives worker restarts, which
+a per-worker sleep would start over every time gunicorn recycles a worker.
+"""
+import asyncio
+import logging
+
+from itemize import models
+
+from itemize.config import CONFIG
+from itemize.db import DB
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from typing import Awaitable, Callable
+
+
+logger = logging.getLogger(__name__)
+
+
+async def claim_run(name: str, interval_seconds: float) -> bool:
+    """
+    Claim the next run of a job, returning False if it is not due yet or
+    another worker claimed it first.
+    """
+    now = datetime.utcnow()
+    async with DB.session() as session:
+        claimed = await session.execute(
+            update(models.JobRun)
+            .where(
+                models.JobRun.name == name,
+                models.JobRun.last_run_at <= now - timedelta(seconds=interval_seconds),
+            )
+            .values(last_run_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if claimed.rowcount:
+            await session.commit()
+            return True
+        # not due, or never run: the first run inserts the row, and of
+        # concurrent first runs only one gets past the unique name
+        session.add(models.JobRun(name=name, last_run_at=now))
+        try:
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            return False
+        return True
+
+
+async def run_periodically(
+    name: str, interval_seconds: float, job: Callable[[], Awaitable[None]]
+) -> None:
+    while True:
+        try:
+            if await claim_run(name, interval_seconds):
+                await job()
+        except Exception:
+            logger.exception("Periodic job failed", extra={"job": name})
+        await asyncio.sleep(min(interval_seconds, CONFIG.SCHEDULE_POLL_SECONDS))
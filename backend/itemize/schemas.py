@@ -1,7 +1,8 @@
 import pydantic
 
 from datetime import datetime
-from typing import Optional
+from decimal import Decimal
+from typing import Literal, Optional
 
 
 class BaseModel(pydantic.BaseModel):
@@ -33,6 +34,8 @@ class PageMetadata(DBModel):
     site_name: str | None
     price: str | None
     currency: str | None
+    price_minor: int | None
+    currency_code: str | None
     image_id: int | None
     image: MetadataImage | None
 
@@ -44,6 +47,8 @@ class PageMetadataOverride(DBModel):
     site_name: str | None
     price: str | None
     currency: str | None
+    price_minor: int | None
+    currency_code: str | None
     image_id: int | None
     image: MetadataImage | None
 
@@ -56,6 +61,16 @@ class User(DBModel):
     itemizes: list["Itemize"] | None
 
 
+class AuthUser(BaseModel):
+    """
+    User identity taken from the signed token claims.
+    """
+
+    id: int
+    username: str
+    email: str
+
+
 class Link(DBModel):
     url: str
     itemize_id: int
@@ -66,6 +81,28 @@ class Link(DBModel):
     itemize: Optional["Itemize"]
 
 
+LinkSort = Literal["created_at", "price"]
+SortOrder = Literal["asc", "desc"]
+
+
+class PriceTotal(BaseModel):
+    currency_code: str | None
+    amount_minor: int
+    amount: Decimal
+    links: int
+
+
+class PriceSeries(BaseModel):
+    # columns of one entry per run of unchanged prices, oldest first
+    link_id: int
+    first_seen_at: list[datetime]
+    last_seen_at: list[datetime]
+    currency_code: list[str | None]
+    price_minor: list[int]
+    low_minor: list[int]
+    high_minor: list[int]
+
+
 class Itemize(DBModel):
     name: str
     slug: str
@@ -74,6 +111,8 @@ class Itemize(DBModel):
     public: bool
     user: User | None
     links: list[Link] | None
+    # priced links per currency, only set when getting a single itemize
+    totals: list[PriceTotal] | None = None
 
 
 """
@@ -153,6 +192,10 @@ class UpdateLinkMetadataResponse(APIResponse):
     link: Link
 
 
+class GetLinkPricesResponse(APIResponse):
+    prices: PriceSeries
+
+
 class UpdateItemizeRequest(APIRequest):
     name: str | None
     description: str | None
@@ -161,3 +204,61 @@ class UpdateItemizeRequest(APIRequest):
 
 class UpdateItemizeResponse(APIResponse):
     itemize: Itemize
+
+
+class ImportLinksRequest(APIRequest):
+    urls: list[str]
+
+
+class ImportLinkEvent(APIResponse):
+    type: Literal["link"] = "link"
+    url: str
+    status: Literal["imported", "exists", "failed"]
+    link_id: int | None = None
+    detail: str | None = None
+
+
+class ImportLinksSummary(APIResponse):
+    type: Literal["summary"] = "summary"
+    total: int
+    imported: int
+    exists: int
+    failed: int
+
+
+class DBPoolStatus(APIResponse):
+    pool_class: str
+    dialect: str
+    driver: str
+    size: int | None = None
+    checked_in: int | None = None
+    checked_out: int | None = None
+    overflow: int | None = None
+    max_overflow: int | None = None
+
+
+class PriceDropEvent(BaseModel):
+    page_metadata_id: int
+    url: str
+    title: str | None
+    currency_code: str | None
+    old_price_minor: int
+    new_price_minor: int
+    observed_at: datetime
+
+
+class WatchReport(BaseModel):
+    claimed: int = 0
+    checked: int = 0
+    failed: int = 0
+    changed: int = 0
+    drops: int = 0
+
+
+class GarbageCollectionReport(BaseModel):
+    overrides: int = 0
+    page_metadata: int = 0
+    images: int = 0
+    bytes_reclaimed: int = 0
+    price_observations: int = 0
+    price_observations_downsampled: int = 0
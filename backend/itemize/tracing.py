@@ -0,0 +1,119 @@
+"""
+Optional OpenTelemetry tracing.
+
+Tracing is off unless TRACING_EXPORTER is set and the packages listed in
+requirements.tracing are installed. While it is off span() and
+set_attributes() are no-ops, so call sites do not need to check.
+"""
+import logging
+
+from itemize.config import CONFIG
+
+from contextlib import contextmanager
+
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from typing import Any, Iterator
+
+
+logger = logging.getLogger(__name__)
+
+AttributeValue = str | int | float | bool
+
+_tracer: Any = None
+_memory_exporter: Any = None
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+@contextmanager
+def span(name: str, **attributes: AttributeValue) -> Iterator[None]:
+    if _tracer is None:
+        yield
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes):
+        yield
+
+
+def set_attributes(**attributes: AttributeValue) -> None:
+    """
+    Set attributes on the current span, e.g. a status code that is only known
+    once the traced work has finished.
+    """
+    if _tracer is None:
+        return
+    from opentelemetry import trace
+
+    current = trace.get_current_span()
+    for key, value in attributes.items():
+        current.set_attribute(key, value)
+
+
+def finished_spans() -> list[Any]:
+    """
+    Spans recorded so far by the "memory" exporter, oldest first.
+    """
+    if _memory_exporter is None:
+        return []
+    return list(_memory_exporter.get_finished_spans())
+
+
+def setup(app: FastAPI, engine: AsyncEngine) -> None:
+    global _tracer, _memory_exporter
+
+    if CONFIG.TRACING_EXPORTER == "none":
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+        from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import (
+            BatchSpanProcessor,
+            ConsoleSpanExporter,
+            SimpleSpanProcessor,
+        )
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+            InMemorySpanExporter,
+        )
+    except ImportError:
+        logger.warning(
+            "TRACING_EXPORTER is %r but opentelemetry is not installed,"
+            " tracing is disabled",
+            CONFIG.TRACING_EXPORTER,
+        )
+        return
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": CONFIG.TRACING_SERVICE_NAME})
+    )
+    match CONFIG.TRACING_EXPORTER:
+        case "console":
+            provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+        case "memory":
+            _memory_exporter = InMemorySpanExporter()
+            provider.add_span_processor(SimpleSpanProcessor(_memory_exporter))
+        case "otlp":
+            # endpoint and headers come from the standard OTEL_EXPORTER_OTLP_*
+            # environment variables
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+                OTLPSpanExporter,
+            )
+
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        case exporter:
+            raise ValueError(f"Unknown tracing exporter: {exporter}")
+
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("itemize")
+
+    FastAPIInstrumentor.instrument_app(
+        app, tracer_provider=provider, excluded_urls="/metrics"
+    )
+    SQLAlchemyInstrumentor().instrument(
+        engine=engine.sync_engine, tracer_provider=provider
+    )
@@ -1,18 +1,26 @@
-import bcrypt
 import jwt
+import time
 
 import itemize.models as models
 import itemize.schemas as schemas
 import re
 
+from itemize import metrics
+from itemize import passwords
+
 from itemize.config import CONFIG
+from itemize.resources import Resources
 from itemize.errors import (
     InvalidUsernameError,
     UserExistsError,
+    UserNotFoundError,
     InvalidCredentialsError,
 )
 
-from sqlalchemy import func, select, or_
+from collections import OrderedDict
+
+from sqlalchemy import exists, select, or_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from datetime import datetime, timedelta
@@ -21,43 +29,28 @@ from datetime import datetime, timedelta
 USERNAME_REGEX = re.compile(r"^[a-zA-Z0-9_]{3,20}$")
 EMAIL_REGEX = re.compile(r"^\S+@\S+\.\S+$")
 
+# user id -> (expires at, token version)
+_token_versions: OrderedDict[int, tuple[float, int]] = OrderedDict()
+
 
 def is_email(email: str) -> bool:
     return EMAIL_REGEX.match(email) is not None
 
 
 async def check_email_exists(session: AsyncSession, email: str) -> bool:
-    existing_user = (
-        await session.scalar(
-            select(func.count())
-            .select_from(models.User)
-            .where(
-                models.User.email == email,
-            )
-        )
-        or 0
+    return bool(
+        await session.scalar(select(exists().where(models.User.email == email)))
     )
 
-    return existing_user > 0
-
 
 async def check_username_exists(session: AsyncSession, username: str) -> bool:
     if not USERNAME_REGEX.match(username):
         raise InvalidUsernameError("Invalid username!")
 
-    existing_user = (
-        await session.scalar(
-            select(func.count())
-            .select_from(models.User)
-            .where(
-                models.User.username == username,
-            )
-        )
-        or 0
+    return bool(
+        await session.scalar(select(exists().where(models.User.username == username)))
     )
 
-    return existing_user > 0
-
 
 async def create_user(
     session: AsyncSession,
@@ -66,29 +59,27 @@ async def create_user(
     password: str,
     first_name: str,
     last_name: str,
+    *,
+    resources: Resources,
 ) -> None:
     if not USERNAME_REGEX.match(username):
         raise InvalidUsernameError("Invalid username!")
 
-    existing_user = (
-        await session.scalar(
-            select(func.count())
-            .select_from(models.User)
-            .where(
+    existing_user = await session.scalar(
+        select(
+            exists().where(
                 or_(
                     models.User.username == username,
                     models.User.email == email,
                 )
             )
         )
-        or 0
     )
 
-    if existing_user > 0:
+    if existing_user:
         raise UserExistsError("Username or Email already in use!")
 
-    salt = bcrypt.gensalt()
-    hashed_password = bcrypt.hashpw(password.encode("utf-8"), salt)
+    hashed_password = await passwords.hash_password(password, resources.password_pool)
 
     user = models.User(
         username=username,
@@ -98,11 +89,20 @@ async def create_user(
         last_name=last_name,
     )
     session.add(user)
-    await session.commit()
+    try:
+        await session.commit()
+    except IntegrityError:
+        # lost a race with another signup for the same username or email
+        await session.rollback()
+        raise UserExistsError("Username or Email already in use!")
 
 
 async def login_user(
-    session: AsyncSession, username_or_email: str, password: str
+    session: AsyncSession,
+    username_or_email: str,
+    password: str,
+    *,
+    resources: Resources,
 ) -> tuple[str, schemas.User]:
     user = await session.scalar(
         select(models.User).where(
@@ -116,15 +116,24 @@ async def login_user(
     if user is None:
         raise InvalidCredentialsError("Username, email, or password may be incorrect!")
 
-    if not bcrypt.checkpw(password.encode("utf-8"), user.hashed_password):
+    if not await passwords.verify_password(
+        password, user.hashed_password, resources.password_pool
+    ):
         raise InvalidCredentialsError("Username, email, or password may be incorrect!")
 
+    if passwords.needs_rehash(user.hashed_password):
+        user.hashed_password = await passwords.hash_password(
+            password, resources.password_pool
+        )
+        await session.commit()
+
     return (
         jwt.encode(
             {
                 "sub": user.id,
                 "username": user.username,
                 "email": user.email,
+                "ver": user.token_version,
                 "exp": datetime.utcnow()
                 + timedelta(minutes=CONFIG.JWT_EXPIRATION_MINUTES),
             },
@@ -133,3 +142,47 @@ async def login_user(
         ),
         await user.to_schema(),
     )
+
+
+async def get_token_version(session: AsyncSession, user_id: int) -> int | None:
+    """
+    Current token version of a user, or None if the user no longer exists.
+    Versions are cached briefly so authenticated requests usually skip the
+    database entirely.
+    """
+    now = time.monotonic()
+    cached = _token_versions.get(user_id)
+    hit = cached is not None and cached[0] > now
+    metrics.record_cache("token_version", hit)
+    if cached is not None and hit:
+        return cached[1]
+
+    token_version = await session.scalar(
+        select(models.User.token_version).where(models.User.id == user_id)
+    )
+    if token_version is None:
+        _token_versions.pop(user_id, None)
+        return None
+
+    _token_versions[user_id] = (now + CONFIG.AUTH_CACHE_TTL_SECONDS, token_version)
+    _token_versions.move_to_end(user_id)
+    while len(_token_versions) > CONFIG.AUTH_CACHE_MAX_ENTRIES:
+        _token_versions.popitem(last=False)
+    return token_version
+
+
+async def revoke_tokens(session: AsyncSession, user_id: int) -> None:
+    await session.execute(
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(token_version=models.User.token_version + 1)
+    )
+    await session.commit()
+    _token_versions.pop(user_id, None)
+
+
+async def get_user(session: AsyncSession, user_id: int) -> schemas.User:
+    user = await session.get(models.User, user_id)
+    if user is None:
+        raise UserNotFoundError("User not found!")
+    return await user.to_schema()
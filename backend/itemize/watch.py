@@ -0,0 +1,368 @@
+"""
+Price watching.
+
+Every WATCH_INTERVAL_SECONDS the watcher re-fetches the pages linked from any
+itemize that have not been fetched or checked within the interval, stores
+changed prices and publishes a price drop event whenever a page got cheaper
+in the same currency. Every price seen is also recorded in the price history.
+
+A pass walks the due pages in keyset order by id, WATCH_BATCH_SIZE at a
+time, and claims each batch by setting checked_at with a conditional UPDATE,
+so every worker (and every node sharing the database) can run the watcher
+and they split the pages between them instead of fetching them twice.
+
+Claimed pages are queued per domain. A domain is fetched by at most
+WATCH_DOMAIN_CONCURRENCY tasks with a WATCH_DOMAIN_DELAY_SECONDS pause after
+each fetch, so the pooled HTTP client keeps reusing its connections to the
+host and no retailer sees a burst, while different domains are fetched in
+parallel. At most WATCH_MAX_IN_FLIGHT pages are queued or being fetched at
+once, claiming the next batch waits for room, so memory stays flat however
+many pages are watched. Changed prices are written back with one bulk UPDATE
+per WATCH_BATCH_SIZE changes. Domain limits apply per worker process.
+
+Pages that fail to download, or no longer show a price, keep their stored
+price and are tried again next interval.
+"""
+import asyncio
+import logging
+
+from itemize import cache
+from itemize import metadata
+from itemize import metrics
+from itemize import models
+from itemize import prices
+from itemize import schemas
+
+from itemize.config import CONFIG
+from itemize.db import DB
+from itemize.resources import Resources
+
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import exists, func, select, update
+
+from typing import Awaitable, Callable
+
+
+logger = logging.getLogger(__name__)
+
+_task: asyncio.Task[None] | None = None
+
+
+@dataclass(frozen=True)
+class WatchedPage:
+    id: int
+    url: str
+    title: str | None
+    price_minor: int | None
+    currency_code: str | None
+
+
+@dataclass(frozen=True)
+class PriceChange:
+    page: WatchedPage
+    price: str | None
+    currency: str | None
+    price_minor: int
+    currency_code: str | None
+    observed_at: datetime
+
+    def drop_event(self) -> schemas.PriceDropEvent | None:
+        """
+        The event to publish if the page got cheaper in the same currency.
+        """
+        old_price_minor = self.page.price_minor
+        if (
+            old_price_minor is None
+            or self.page.currency_code != self.currency_code
+            or self.price_minor >= old_price_minor
+        ):
+            return None
+        return schemas.PriceDropEvent(
+            page_metadata_id=self.page.id,
+            url=self.page.url,
+            title=self.page.title,
+            currency_code=self.currency_code,
+            old_price_minor=old_price_minor,
+            new_price_minor=self.price_minor,
+            observed_at=self.observed_at,
+        )
+
+
+class DomainScheduler:
+    """
+    Runs a handler over submitted pages with one queue per domain.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[WatchedPage], Awaitable[None]],
+        *,
+        concurrency: int,
+        delay_seconds: float,
+        max_in_flight: int,
+    ) -> None:
+        self._handler = handler
+        self._concurrency = concurrency
+        self._delay_seconds = delay_seconds
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._queues: dict[str, deque[WatchedPage]] = {}
+        self._workers: dict[str, int] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def submit(self, page: WatchedPage) -> None:
+        await self._slots.acquire()
+        domain = metrics.fetch_domain(page.url)
+        self._queues.setdefault(domain, deque()).append(page)
+        if self._workers.get(domain, 0) < self._concurrency:
+            self._workers[domain] = self._workers.get(domain, 0) + 1
+            task = asyncio.create_task(self._work(domain))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _work(self, domain: str) -> None:
+        queue = self._queues[domain]
+        try:
+            while queue:
+                page = queue.popleft()
+                try:
+                    await self._handler(page)
+                except Exception:
+                    logger.exception("Checking page failed", extra={"url": page.url})
+                finally:
+                    self._slots.release()
+                # also after the last page, so a page of this domain submitted
+                # meanwhile is not fetched right away
+                if self._delay_seconds > 0:
+                    await asyncio.sleep(self._delay_seconds)
+        finally:
+            self._workers[domain] -= 1
+            if not self._workers[domain]:
+                del self._workers[domain]
+                del self._queues[domain]
+
+    async def join(self) -> None:
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
+
+    async def cancel(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+async def claim_due_pages(
+    *, after_id: int, cutoff: datetime, limit: int
+) -> tuple[int | None, list[WatchedPage]]:
+    """
+    Claim the next batch of due pages after after_id, returning the last id
+    looked at (None when there are no more) and the pages this call claimed.
+    """
+    async with DB.session() as session:
+        ids = list(
+            await session.scalars(
+                select(models.PageMetadata.id)
+                .where(
+                    models.PageMetadata.id > after_id,
+                    func.coalesce(
+                        models.PageMetadata.checked_at, models.PageMetadata.updated_at
+                    )
+                    < cutoff,
+                    exists().where(
+                        models.Link.page_metadata_id == models.PageMetadata.id
+                    ),
+                )
+                .order_by(models.PageMetadata.id)
+                .limit(limit)
+            )
+        )
+        if not ids:
+            return None, []
+        # another worker may have claimed some of them since, those are skipped
+        rows = await session.execute(
+            update(models.PageMetadata)
+            .where(
+                models.PageMetadata.id.in_(ids),
+                func.coalesce(
+                    models.PageMetadata.checked_at, models.PageMetadata.updated_at
+                )
+                < cutoff,
+            )
+            # keep updated_at, it tells when the page itself last changed
+            .values(
+                checked_at=datetime.utcnow(),
+                updated_at=models.PageMetadata.updated_at,
+            )
+            .returning(
+                models.PageMetadata.id,
+                models.PageMetadata.url,
+                models.PageMetadata.title,
+                models.PageMetadata.price_minor,
+                models.PageMetadata.currency_code,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        pages = [WatchedPage(*row) for row in rows]
+        await session.commit()
+    return ids[-1], pages
+
+
+class PriceWatcher:
+    def __init__(
+        self,
+        resources: Resources,
+        *,
+        interval_seconds: float,
+        batch_size: int,
+        max_in_flight: int,
+        domain_concurrency: int,
+        domain_delay_seconds: float,
+    ) -> None:
+        self._resources = resources
+        self._interval_seconds = interval_seconds
+        self._batch_size = batch_size
+        self._max_in_flight = max_in_flight
+        self._domain_concurrency = domain_concurrency
+        self._domain_delay_seconds = domain_delay_seconds
+        self._changes: list[PriceChange] = []
+        self._write_lock = asyncio.Lock()
+        self._report = schemas.WatchReport()
+
+    async def run_once(self) -> schemas.WatchReport:
+        self._report = schemas.WatchReport()
+        cutoff = datetime.utcnow() - timedelta(seconds=self._interval_seconds)
+        scheduler = DomainScheduler(
+            self._check,
+            concurrency=self._domain_concurrency,
+            delay_seconds=self._domain_delay_seconds,
+            max_in_flight=self._max_in_flight,
+        )
+        after_id: int | None = 0
+        try:
+            while after_id is not None:
+                after_id, pages = await claim_due_pages(
+                    after_id=after_id, cutoff=cutoff, limit=self._batch_size
+                )
+                self._report.claimed += len(pages)
+                for page in pages:
+                    await scheduler.submit(page)
+            await scheduler.join()
+        finally:
+            await scheduler.cancel()
+            await self._write_changes()
+        return self._report
+
+    async def _check(self, page: WatchedPage) -> None:
+        try:
+            # pages are refetched every interval, so no dumps or INFO logs
+            status_code, parsed = await metadata.fetch_page(
+                page.url, resources=self._resources, log_pagedata=False
+            )
+        except Exception as e:
+            self._report.failed += 1
+            logger.info(
+                "Could not check page", extra={"url": page.url, "error": repr(e)}
+            )
+            return
+        if status_code != 200:
+            self._report.failed += 1
+            return
+
+        self._report.checked += 1
+        price_minor, currency_code = prices.normalize(parsed.price, parsed.currency)
+        if price_minor is None:
+            return
+        self._resources.price_history.record(page.id, price_minor, currency_code)
+        if (price_minor, currency_code) == (page.price_minor, page.currency_code):
+            return
+        self._changes.append(
+            PriceChange(
+                page=page,
+                price=parsed.price,
+                currency=parsed.currency,
+                price_minor=price_minor,
+                currency_code=currency_code,
+                observed_at=datetime.utcnow(),
+            )
+        )
+        if len(self._changes) >= self._batch_size:
+            await self._write_changes()
+
+    async def _write_changes(self) -> None:
+        async with self._write_lock:
+            changes, self._changes = self._changes, []
+            if not changes:
+                return
+            async with DB.session() as session:
+                # one executemany UPDATE by primary key
+                await session.execute(
+                    update(models.PageMetadata),
+                    [
+                        {
+                            "id": change.page.id,
+                            "price": change.price,
+                            "currency": change.currency,
+                            "price_minor": change.price_minor,
+                            "currency_code": change.currency_code,
+                        }
+                        for change in changes
+                    ],
+                )
+                await session.commit()
+                await cache.invalidate_page_metadata(
+                    session,
+                    self._resources.response_cache,
+                    *(change.page.id for change in changes),
+                )
+
+            drops = [
+                event
+                for change in changes
+                if (event := change.drop_event()) is not None
+            ]
+            await self._resources.price_drops.publish(drops)
+            self._report.changed += len(changes)
+            self._report.drops += len(drops)
+
+
+def create_watcher(resources: Resources) -> PriceWatcher:
+    return PriceWatcher(
+        resources,
+        interval_seconds=CONFIG.WATCH_INTERVAL_SECONDS,
+        batch_size=CONFIG.WATCH_BATCH_SIZE,
+        max_in_flight=CONFIG.WATCH_MAX_IN_FLIGHT,
+        domain_concurrency=CONFIG.WATCH_DOMAIN_CONCURRENCY,
+        domain_delay_seconds=CONFIG.WATCH_DOMAIN_DELAY_SECONDS,
+    )
+
+
+async def run_watcher(watcher: PriceWatcher) -> None:
+    # first pass right away, a worker recycled before the interval is up would
+    # otherwise never run one; pages are claimed, so passes of several workers
+    # split what is due rather than repeat it
+    while True:
+        try:
+            report = await watcher.run_once()
+            logger.info("Price watch finished", extra=report.model_dump())
+        except Exception:
+            logger.exception("Price watch failed")
+        await asyncio.sleep(CONFIG.WATCH_INTERVAL_SECONDS)
+
+
+def start(resources: Resources) -> None:
+    global _task
+    if CONFIG.WATCH_INTERVAL_SECONDS > 0 and _task is None:
+        _task = asyncio.create_task(run_watcher(create_watcher(resources)))
+
+
+async def stop() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
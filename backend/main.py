@@ -1,32 +1,64 @@
 import itemize.api.metadata
 import itemize.api.users
 import itemize.api.itemize
+import itemize.api.system
+import itemize.api.metrics
 
+import itemize.cleanup
 import itemize.errors
+import itemize.log
+import itemize.metrics
+import itemize.tracing
+import itemize.watch
 
 import logging
+import time
+
+from itemize.resources import open_resources
 
 from itemize.db import DB
 from itemize.config import CONFIG
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from contextlib import asynccontextmanager
+
+from typing import Any, AsyncIterator, Awaitable, Callable
+
 
 """
 LOGGING CONFIG
 """
-logging.basicConfig(
-    format=CONFIG.LOG_FORMAT, level=logging.getLevelNamesMapping()[CONFIG.LOG_LEVEL]
-)
+itemize.log.setup()
+
+logging.getLogger(__name__).info(CONFIG)
+
+
+"""
+FastAPI Lifespan
+"""
+
 
-logging.info(CONFIG)
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[dict[str, Any]]:
+    await DB.init_db()
+    async with open_resources() as resources:
+        itemize.cleanup.start()
+        itemize.watch.start(resources)
+        try:
+            # exposed to requests as request.state.resources
+            yield {"resources": resources}
+        finally:
+            await itemize.watch.stop()
+            await itemize.cleanup.stop()
+    await DB.engine.dispose()
 
 
 """
 FastAPI App
 """
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -35,12 +67,32 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def time_request(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # label by route template, not path, to keep cardinality bounded
+        route = request.scope.get("route")
+        itemize.metrics.HTTP_REQUEST_SECONDS.labels(
+            request.method, getattr(route, "path", "unmatched"), str(status_code)
+        ).observe(time.perf_counter() - started)
+
+
 """
 FastAPI Routers
 """
 app.include_router(itemize.api.metadata.router, tags=["metadata"])
 app.include_router(itemize.api.users.router, tags=["users"])
 app.include_router(itemize.api.itemize.router, tags=["itemize"])
+app.include_router(itemize.api.system.router, tags=["system"])
+app.include_router(itemize.api.metrics.router, tags=["system"])
 
 
 """
@@ -52,10 +104,6 @@ app.add_exception_handler(
 
 
 """
-FastAPI Events
+Tracing
 """
-
-
-@app.on_event("startup")
-async def startup() -> None:
-    await DB.init_db()
+itemize.tracing.setup(app, DB.engine)
@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 from alembic import context
 
 from itemize.config import CONFIG
+from itemize.db import database_url
 from itemize import models
 
 # this is the Alembic Config object, which provides
@@ -15,7 +16,10 @@ from itemize import models
 config = context.config
 
 # load DB_URI
-config.set_main_option('sqlalchemy.url', CONFIG.DB_URI)
+config.set_main_option(
+    'sqlalchemy.url',
+    database_url(CONFIG.DB_URI).render_as_string(hide_password=False).replace('%', '%%'),
+)
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
@@ -0,0 +1,166 @@
+"""Add normalized prices
+
+Revision ID: 3b9f0c2d7e41
+Revises: 6881228e17be
+Create Date: 2026-10-19 14:32:10.418305
+
+"""
+import re
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Optional, Sequence, Tuple, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9f0c2d7e41'
+down_revision: Union[str, None] = '6881228e17be'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# a copy of itemize.prices as of this revision, so later changes to the
+# parser cannot change what this migration writes
+_CODES_BY_EXPONENT = {
+    0: 'BIF CLP DJF GNF ISK JPY KMF KRW PYG RWF UGX UYI VND VUV XAF XOF XPF',
+    2: (
+        'AED AFN ALL AMD ANG AOA ARS AUD AWG AZN BAM BBD BDT BGN BMD BND BOB BOV '
+        'BRL BSD BTN BWP BYN BZD CAD CDF CHE CHF CHW CNY COP COU CRC CUP CVE CZK '
+        'DKK DOP DZD EGP ERN ETB EUR FJD FKP GBP GEL GHS GIP GMD GTQ GYD HKD HNL '
+        'HTG HUF IDR ILS INR IRR JMD KES KGS KHR KPW KYD KZT LAK LBP LKR LRD LSL '
+        'MAD MDL MGA MKD MMK MNT MOP MRU MUR MVR MWK MXN MXV MYR MZN NAD NGN NIO '
+        'NOK NPR NZD PAB PEN PGK PHP PKR PLN QAR RON RSD RUB SAR SBD SCR SDG SEK '
+        'SGD SHP SLE SOS SRD SSP STN SVC SYP SZL THB TJS TMT TOP TRY TTD TWD TZS '
+        'UAH USD USN UYU UZS VED VES WST XCD XCG YER ZAR ZMW ZWG'
+    ),
+    3: 'BHD IQD JOD KWD LYD OMR TND',
+    4: 'CLF UYW',
+}
+CURRENCY_EXPONENTS = {
+    code: exponent
+    for exponent, codes in _CODES_BY_EXPONENT.items()
+    for code in codes.split()
+}
+DEFAULT_EXPONENT = 2
+CURRENCY_SYMBOLS = {
+    'US$': 'USD', 'CA$': 'CAD', 'AU$': 'AUD', 'NZ$': 'NZD', 'HK$': 'HKD',
+    'R$': 'BRL', 'C$': 'CAD', 'A$': 'AUD', 'zł': 'PLN', '$': 'USD',
+    '€': 'EUR', '£': 'GBP', '¥': 'JPY', '₹': 'INR', '₩': 'KRW',
+    '₽': 'RUB', '₺': 'TRY', '₪': 'ILS',
+}
+_CODE = re.compile(r'\b([A-Z]{3})\b')
+_AMOUNT = re.compile(r"\d(?:[\d.,'\s\u00a0\u202f]*\d)?")
+_GROUPING = re.compile(r"['\s\u00a0\u202f]")
+
+
+def _exponent(currency_code: Optional[str]) -> int:
+    return CURRENCY_EXPONENTS.get(currency_code or '', DEFAULT_EXPONENT)
+
+
+def _parse_currency(*texts: Optional[str]) -> Optional[str]:
+    for text in texts:
+        if not text:
+            continue
+        if text.strip().upper() in CURRENCY_EXPONENTS:
+            return text.strip().upper()
+        for match in _CODE.finditer(text):
+            if match.group(1) in CURRENCY_EXPONENTS:
+                return match.group(1)
+        for symbol, code in CURRENCY_SYMBOLS.items():
+            if symbol in text:
+                return code
+    return None
+
+
+def _parse_amount(text: str, currency_code: Optional[str]) -> Optional[Decimal]:
+    match = _AMOUNT.search(text)
+    if match is None:
+        return None
+    number = _GROUPING.sub('', match.group())
+    commas, dots = number.count(','), number.count('.')
+    if commas and dots:
+        decimal_point = ',' if number.rfind(',') > number.rfind('.') else '.'
+    elif commas + dots == 1:
+        separator = ',' if commas else '.'
+        fraction = number.rsplit(separator, 1)[1]
+        is_grouping = len(fraction) == 3 and _exponent(currency_code) != 3
+        decimal_point = '' if is_grouping else separator
+    else:
+        decimal_point = ''
+    integer, _, fraction = (
+        number.rpartition(decimal_point) if decimal_point else (number, '', '')
+    )
+    try:
+        return Decimal(re.sub(r'[.,]', '', integer) + '.' + (fraction or '0'))
+    except InvalidOperation:
+        return None
+
+
+def _normalize(price: Optional[str], currency: Optional[str]) -> Tuple[Optional[int], Optional[str]]:
+    currency_code = _parse_currency(currency, price)
+    if price is None:
+        return None, currency_code
+    amount = _parse_amount(price, currency_code)
+    if amount is None:
+        return None, currency_code
+    minor = amount.scaleb(_exponent(currency_code)).quantize(1, ROUND_HALF_UP)
+    return int(minor), currency_code
+
+
+def upgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('pagemetadata', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('price_minor', sa.BigInteger(), nullable=True, comment='Price in minor units of currency_code'))
+        batch_op.add_column(sa.Column('currency_code', sa.String(length=3), nullable=True, comment='ISO 4217 currency code'))
+        batch_op.create_index(batch_op.f('ix_pagemetadata_currency_code'), ['currency_code'], unique=False)
+        batch_op.create_index(batch_op.f('ix_pagemetadata_price_minor'), ['price_minor'], unique=False)
+
+    with op.batch_alter_table('pagemetadataoverride', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('price_minor', sa.BigInteger(), nullable=True, comment='Price in minor units of currency_code'))
+        batch_op.add_column(sa.Column('currency_code', sa.String(length=3), nullable=True, comment='ISO 4217 currency code'))
+        batch_op.create_index(batch_op.f('ix_pagemetadataoverride_currency_code'), ['currency_code'], unique=False)
+        batch_op.create_index(batch_op.f('ix_pagemetadataoverride_price_minor'), ['price_minor'], unique=False)
+
+    # ### end Alembic commands ###
+
+    # backfill from the stored strings, overrides fall back to the currency
+    # of the page they override like update_link_metadata does
+    connection = op.get_bind()
+    for row in connection.execute(
+        sa.text('SELECT id, price, currency FROM pagemetadata WHERE price IS NOT NULL OR currency IS NOT NULL')
+    ).all():
+        price_minor, currency_code = _normalize(row.price, row.currency)
+        connection.execute(
+            sa.text('UPDATE pagemetadata SET price_minor = :price_minor, currency_code = :currency_code WHERE id = :id'),
+            {'id': row.id, 'price_minor': price_minor, 'currency_code': currency_code},
+        )
+    for row in connection.execute(
+        sa.text(
+            'SELECT o.id, o.price, o.currency, m.currency AS page_currency FROM pagemetadataoverride o '
+            'LEFT JOIN link l ON l.page_metadata_override_id = o.id '
+            'LEFT JOIN pagemetadata m ON m.id = l.page_metadata_id '
+            'WHERE o.price IS NOT NULL OR o.currency IS NOT NULL'
+        )
+    ).all():
+        price_minor, currency_code = _normalize(row.price, row.currency or row.page_currency)
+        connection.execute(
+            sa.text('UPDATE pagemetadataoverride SET price_minor = :price_minor, currency_code = :currency_code WHERE id = :id'),
+            {'id': row.id, 'price_minor': price_minor, 'currency_code': currency_code},
+        )
+
+
+def downgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('pagemetadataoverride', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pagemetadataoverride_price_minor'))
+        batch_op.drop_index(batch_op.f('ix_pagemetadataoverride_currency_code'))
+        batch_op.drop_column('currency_code')
+        batch_op.drop_column('price_minor')
+
+    with op.batch_alter_table('pagemetadata', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pagemetadata_price_minor'))
+        batch_op.drop_index(batch_op.f('ix_pagemetadata_currency_code'))
+        batch_op.drop_column('currency_code')
+        batch_op.drop_column('price_minor')
+
+    # ### end Alembic commands ###
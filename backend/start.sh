@@ -7,6 +7,7 @@ STOP_AFTER_MIGRATIONS=${STOP_AFTER_MIGRATIONS:-"false"}
 MIGRATION_DOWNGRADE_VERSION=${MIGRATION_DOWNGRADE_VERSION:-""}
 PORT=${PORT:-"8000"}
 HOST=${HOST:-"0.0.0.0"}
+WEB_CONCURRENCY=${WEB_CONCURRENCY:-"1"}
 
 if [ "$RUN_MIGRATIONS" = "true" ]; then
     echo "Running migrations..."
@@ -22,4 +23,11 @@ if [ "$RUN_MIGRATIONS" = "true" ]; then
     fi
 fi
 
-uvicorn main:app --host "$HOST" --port "$PORT"
+# with several workers each one only sees its own metrics, so they are
+# written to a shared directory and aggregated on scrape
+if [ "$WEB_CONCURRENCY" -gt 1 ]; then
+    export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-"/tmp/itemize-metrics"}
+fi
+
+export PORT HOST WEB_CONCURRENCY
+exec gunicorn -c gunicorn.conf.py main:app
@@ -2,6 +2,6 @@
 
 set -e
 
-python -m mypy --strict main.py itemize/
+python -m mypy --strict main.py gunicorn.conf.py itemize/ bench/
 
-python -m flake8 main.py itemize/
+python -m flake8 main.py gunicorn.conf.py itemize/ bench/